@@ -0,0 +1,125 @@
+import numpy as np
+
+from audiobuffer import samples, to_float
+
+def words_from_alignment(alignment, offset=0.0):
+    # ElevenLabs' per-character timings -> the {"text", "start", "end"} words Whisper gives us
+    words = []
+    text, start, end = [], None, None
+    chars = alignment["characters"]
+    starts = alignment["character_start_times_seconds"]
+    ends = alignment["character_end_times_seconds"]
+    for ch, s, e in zip(chars, starts, ends):
+        if ch.isspace():
+            if text:
+                words.append({"text": "".join(text), "start": start + offset, "end": end + offset})
+            text = []
+            continue
+        if not text:
+            start = s
+        text.append(ch)
+        end = e
+    if text:
+        words.append({"text": "".join(text), "start": start + offset, "end": end + offset})
+    return words
+
+def scale_words(words, factor):
+    return [dict(w, start=w["start"] * factor, end=w["end"] * factor) for w in words]
+
+def read_wav_mono(path):
+    data, rate = samples(path)
+    return to_float(data).mean(axis=1), rate
+
+def pauses(voiced, min_frames):
+    # (first, last) frame of every silent run of at least min_frames inside the speech
+    runs = []
+    start = None
+    for i, v in enumerate(voiced):
+        if not v and start is None:
+            start = i
+        elif v and start is not None:
+            if i - start >= min_frames and start > 0:
+                runs.append((start, i))
+            start = None
+    return runs
+
+def boundary_costs(words):
+    # how surprising a pause after each word is: free after a sentence, cheap after a comma
+    return np.array([0.0 if w[-1] in ".!?" else 0.5 if w[-1] in ",;:-" else 3.0 for w in words[:-1]])
+
+def match_pauses(pause_positions, expected, costs, spread, skip_cost=4.0):
+    # Monotonic DP: every pause either lands on one word boundary or is a breath that matches
+    # none. State s is "last match was boundary s - 1" (s = 0: nothing matched yet).
+    boundaries = len(expected)
+    index = np.arange(boundaries)
+    best = np.zeros(boundaries + 1)
+    steps = []
+    for position in pause_positions:
+        prefix = np.minimum.accumulate(best[:-1])  # cheapest state that may precede boundary b
+        prefix_at = np.maximum.accumulate(np.where(best[:-1] == prefix, index, 0))
+        matched = prefix + ((expected - position) / spread) ** 2 + costs
+        new = best + skip_cost
+        take = matched < new[1:]
+        new[1:][take] = matched[take]
+        steps.append((take, prefix_at))
+        best = new
+    pairs = []
+    state = int(np.argmin(best))
+    for p in range(len(pause_positions) - 1, -1, -1):
+        take, prefix_at = steps[p]
+        if state > 0 and take[state - 1]:
+            pairs.append((p, state - 1))
+            state = int(prefix_at[state - 1])
+    return pairs[::-1]
+
+def spread_words(weights, cum, first, last):
+    # split frames [first, last) between words in proportion to weight, counting voiced frames only
+    n = len(cum)
+    base = cum[first - 1] if first > 0 else 0
+    voiced = max(cum[last - 1] - base, 1)
+    bounds = base + np.concatenate([[0], np.cumsum(weights) / weights.sum() * voiced])
+    frames = np.clip(np.searchsorted(cum, bounds, side="right"), first, min(last, n))
+    frames[-1] = last
+    return frames
+
+def align_script(samples, rate, text, frame_ms=10, min_pause_ms=120):
+    # Forced alignment without a model: we know exactly what was said, so we only have to find
+    # where. Pauses in the audio are matched to word boundaries (preferring punctuation), and
+    # between those anchors words share the voiced frames in proportion to their length.
+    words = text.split()
+    if not words:
+        return []
+    hop = max(1, int(rate * frame_ms / 1000))
+    n = len(samples) // hop
+    if n == 0:
+        return [{"text": w, "start": 0.0, "end": 0.0} for w in words]
+    frames = samples[:n * hop].reshape(n, hop)
+    db = 20 * np.log10(np.sqrt(np.mean(frames ** 2, axis=1)) + 1e-6)
+    floor, peak = np.percentile(db, 10), np.percentile(db, 95)
+    voiced = db > floor + 0.3 * (peak - floor)
+    if not voiced.any():
+        voiced[:] = True
+    cum = np.cumsum(voiced)
+    speech = np.flatnonzero(voiced)
+    first_frame, last_frame = int(speech[0]), int(speech[-1]) + 1
+
+    weights = np.array([len(w) + 1 for w in words], float)
+    expected = np.cumsum(weights)[:-1] / weights.sum() * cum[-1]
+    found = pauses(voiced, max(1, min_pause_ms // frame_ms))
+    positions = np.array([cum[a] for a, _ in found], float)
+    pairs = match_pauses(positions, expected, boundary_costs(words), spread=max(cum[-1] * 0.04, 50.0))
+
+    starts, ends = np.zeros(len(words), int), np.zeros(len(words), int)
+    word_start, frame = 0, first_frame
+    for p, b in pairs + [(None, len(words) - 1)]:
+        pause_start, pause_end = found[p] if p is not None else (last_frame, last_frame)
+        edges = spread_words(weights[word_start:b + 1], cum, frame, max(pause_start, frame + 1))
+        starts[word_start:b + 1], ends[word_start:b + 1] = edges[:-1], edges[1:]
+        word_start, frame = b + 1, pause_end
+    ends = np.maximum(ends, starts + 1)
+    return [{"text": w, "start": s * frame_ms / 1000, "end": e * frame_ms / 1000}
+            for w, s, e in zip(words, starts.tolist(), ends.tolist())]
+
+def align_audio(audio_path, text):
+    samples, rate = read_wav_mono(audio_path)
+    return align_script(samples, rate, text)
@@ -0,0 +1,136 @@
+import os
+import struct
+import wave
+from typing import NamedTuple
+
+import numpy as np
+
+class AudioSpan(NamedTuple):
+    # [start, end) seconds of a WAV file; end=None runs to the end of the file. Renderers
+    # take one wherever they take an audio path, so parts of a story never get their own WAV
+    path: str
+    start: float = 0.0
+    end: float = None
+
+class WavInfo(NamedTuple):
+    rate: int
+    channels: int
+    dtype: np.dtype
+    offset: int
+    frames: int
+
+class PcmBuffer:
+    # decoded chunks land in one preallocated array that doubles when it runs out, so every
+    # sample is copied a bounded number of times (AudioSegment += copies all of the audio
+    # collected so far, on every chunk)
+    def __init__(self, rate, capacity=0, dtype=np.float32):
+        self.rate = rate
+        self.data = np.empty(max(int(capacity), 1), dtype)
+        self.length = 0
+
+    def append(self, samples):
+        end = self.length + len(samples)
+        if end > len(self.data):
+            grown = np.empty(max(end, 2 * len(self.data)), self.data.dtype)
+            grown[:self.length] = self.data[:self.length]
+            self.data = grown
+        self.data[self.length:end] = samples
+        self.length = end
+
+    @property
+    def samples(self):
+        return self.data[:self.length]
+
+    @property
+    def duration(self):
+        return self.length / self.rate
+
+def as_span(source):
+    return source if isinstance(source, AudioSpan) else AudioSpan(source)
+
+def wav_info(path):
+    # walks the RIFF chunks for the format and where the samples start, without reading them
+    with open(path, "rb") as f:
+        riff, _, kind = struct.unpack("<4sI4s", f.read(12))
+        if riff != b"RIFF" or kind != b"WAVE":
+            raise ValueError(f"{path} is not a WAV file")
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"{path} has no data chunk")
+            chunk, size = struct.unpack("<4sI", header)
+            if chunk == b"fmt ":
+                fmt = struct.unpack("<HHIIHH", f.read(16))
+                f.seek(size - 16 + (size & 1), 1)
+            elif chunk == b"data":
+                if fmt is None:
+                    raise ValueError(f"{path} has no fmt chunk")
+                tag, channels, rate, _, block, bits = fmt
+                dtype = np.float32 if tag == 3 else {8: np.uint8, 16: np.int16, 32: np.int32}[bits]
+                offset = f.tell()
+                # streamed WAVs (ffmpeg writing to a pipe) leave the size as a placeholder
+                size = min(size, os.path.getsize(path) - offset)
+                return WavInfo(rate, channels, np.dtype(dtype), offset, size // block)
+            else:
+                f.seek(size + (size & 1), 1)
+
+def frame_range(span, info):
+    first = min(int(round(span.start * info.rate)), info.frames)
+    last = info.frames if span.end is None else min(int(round(span.end * info.rate)), info.frames)
+    return first, max(first, last)
+
+def duration(source):
+    span = as_span(source)
+    info = wav_info(span.path)
+    first, last = frame_range(span, info)
+    return (last - first) / info.rate
+
+def samples(source):
+    # (frames, channels) of the span, memory-mapped: only the pages something reads are
+    # loaded, and processes rendering the same story share them through the page cache
+    span = as_span(source)
+    info = wav_info(span.path)
+    first, last = frame_range(span, info)
+    if info.frames == 0:
+        return np.zeros((0, info.channels), info.dtype), info.rate
+    data = np.memmap(span.path, info.dtype, "r", info.offset, (info.frames, info.channels))
+    return data[first:last], info.rate
+
+def to_float(data):
+    if data.dtype == np.uint8:
+        return (data.astype(np.float32) - 128) / 128
+    if data.dtype == np.float32:
+        return data
+    return data.astype(np.float32) / float(1 << (8 * data.dtype.itemsize - 1))
+
+def write_wav(path, pcm, rate):
+    # int16 samples, (frames,) or (frames, channels), written straight from the array
+    pcm = np.ascontiguousarray(pcm, dtype=np.int16)
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1 if pcm.ndim == 1 else pcm.shape[1])
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(pcm)
+    return path
+
+def audio_clip(source):
+    # a MoviePy clip over the mapped samples; like AudioFileClip it plays in stereo, but it
+    # needs no ffmpeg reader process and never holds the file in memory
+    from moviepy import AudioClip
+    data, rate = samples(source)
+    last = max(len(data) - 1, 0)
+
+    def frame(t):
+        chunk = to_float(data[np.clip(np.round(np.asarray(t) * rate).astype(int), 0, last)])
+        return np.repeat(chunk, 2, axis=-1) if chunk.shape[-1] == 1 else chunk
+
+    return AudioClip(frame, duration=len(data) / rate, fps=rate)
+
+def ffmpeg_input(source):
+    # input options that make ffmpeg decode just the span
+    span = as_span(source)
+    args = ["-ss", f"{span.start:.3f}"] if span.start else []
+    if span.end is not None:
+        args += ["-t", f"{span.end - span.start:.3f}"]
+    return args + ["-i", span.path]
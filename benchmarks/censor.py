@@ -0,0 +1,64 @@
+# python -m benchmarks.censor
+import random
+import string
+import time
+
+from censoring import CensorEngine, SENSITIVE_TERMS, censor, censor_sensitive, clean_text
+
+BAD_ROOTS = ["fuck", "shit", "bitch", "damn", "cunt", "dick", "ass", "piss"]
+
+FILLER = ("the a and i was to my she he it of in that we they had but for with on at so just "
+          "then when what like really never always because someone something story night house "
+          "class pass grass mass bass dickens scunthorpe assessment").split()
+
+EXTRAS = (list(SENSITIVE_TERMS) + BAD_ROOTS +
+          ["Fucking", "SHITTY", "self-harm", "Kill!", "sex.", "**bold**", "https://example.com/sex",
+           "www.reddit.com/r/tifu", "f*ck", "(murdered)", "ſex", "KILLS,", "bombing's", "asshole-ish"])
+
+def make_post(rng, words=600):
+    out = []
+    for _ in range(words):
+        token = rng.choice(EXTRAS) if rng.random() < 0.03 else rng.choice(FILLER)
+        if rng.random() < 0.1:
+            token = token.capitalize()
+        if rng.random() < 0.08:
+            token += rng.choice(".,!?")
+        out.append(token)
+        out.append(rng.choice([" ", " ", " ", "\n", "\n\n", "  "]))
+    return "".join(out)
+
+def legacy_clean(text, bad):
+    text = censor(text, bad)
+    text = censor_sensitive(text)
+    text = clean_text(text)
+    return text
+
+def fuzz(engine, rng, rounds=3000):
+    alphabet = string.ascii_letters + " \n\t*-'./:" + "ſKß"
+    pieces = EXTRAS + FILLER
+    for _ in range(rounds):
+        text = "".join(rng.choice(pieces) if rng.random() < 0.3 else rng.choice(alphabet) for _ in range(60))
+        assert engine.clean(text) == legacy_clean(text, BAD_ROOTS), repr(text)
+
+if __name__ == "__main__":
+    rng = random.Random(1234)
+    engine = CensorEngine(BAD_ROOTS)
+    fuzz(engine, rng)
+    print("fuzz: 3000 random snippets identical to legacy clean")
+
+    for n_posts in (100, 1000, 5000):
+        posts = [make_post(rng) for _ in range(n_posts)]
+        size_mb = sum(len(p) for p in posts) / 1e6
+
+        start = time.perf_counter()
+        old = [legacy_clean(p, BAD_ROOTS) for p in posts]
+        old_s = time.perf_counter() - start
+
+        engine = CensorEngine(BAD_ROOTS)
+        start = time.perf_counter()
+        new = [engine.clean(p) for p in posts]
+        new_s = time.perf_counter() - start
+
+        assert old == new
+        print(f"{n_posts:>5} posts ({size_mb:5.1f} MB): legacy {old_s:6.2f}s | engine {new_s:6.2f}s | "
+              f"{old_s / new_s:5.1f}x | identical")
@@ -0,0 +1,121 @@
+# python -m benchmarks.comments [fixture.json ...]
+# Fixtures are written by comments.record_submission; without any, synthetic threads are used.
+import json
+import random
+import sys
+import time
+
+from comments import harvest_comments
+
+class Requests:
+    def __init__(self, latency=0.0):
+        self.count = 0
+        self.latency = latency
+
+    def hit(self):
+        self.count += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+class FakeComment:
+    def __init__(self, node, requests):
+        self.body = node["body"]
+        self.parent_id = node["parent_id"]
+        self.replies = FakeForest([build(r, requests) for r in node["replies"]], requests)
+
+class FakeMore:
+    def __init__(self, node, requests):
+        self.node = node
+        self.requests = requests
+
+    def comments(self):
+        # one /api/morechildren call per stub, like PRAW
+        self.requests.hit()
+        return [build(c, self.requests) for c in self.node["more"]]
+
+class FakeForest(list):
+    def __init__(self, items, requests):
+        super().__init__(items)
+        self.requests = requests
+
+    def replace_more(self, limit=None):
+        # PRAW semantics with limit=None: every stub in the whole tree, replies included
+        i = 0
+        while i < len(self):
+            item = self[i]
+            if isinstance(item, FakeMore):
+                self[i:i + 1] = item.comments()
+                continue
+            item.replies.replace_more(limit)
+            i += 1
+
+class FakeSubmission:
+    def __init__(self, data, requests):
+        self.id = data["id"]
+        self.title = data["title"]
+        self.selftext = data["selftext"]
+        self.comment_sort = "confidence"
+        requests.hit()  # the comment page itself
+        self.comments = FakeForest([build(c, requests) for c in data["comments"]], requests)
+
+def build(node, requests):
+    return FakeMore(node, requests) if "more" in node else FakeComment(node, requests)
+
+def legacy_bodies(submission):
+    submission.comments.replace_more(limit=None)
+    return [c.body for c in submission.comments[:20] if len(c.body) > 250]
+
+def synthetic_thread(rng, sid, top_level, page=200, reply_depth=4, more_every=8):
+    def body(long_share=0.3):
+        n = rng.randint(300, 1500) if rng.random() < long_share else rng.randint(20, 240)
+        return "x" * n
+
+    def replies(parent, depth):
+        if depth == 0:
+            return []
+        nodes = [{"body": body(0.1), "parent_id": parent, "replies": []} for _ in range(rng.randint(0, 3))]
+        for i, node in enumerate(nodes):
+            node["replies"] = replies(f"t1_{sid}{depth}{i}", depth - 1)
+        if depth > 1 and rng.random() < 1 / more_every:
+            nodes.append({"more": [{"body": body(0.1), "parent_id": parent, "replies": []} for _ in range(5)]})
+        return nodes
+
+    prefix = f"t3_{sid}"
+    tops = [{"body": body(), "parent_id": prefix, "replies": replies(f"t1_{sid}{i}", reply_depth)}
+            for i in range(top_level)]
+    # the first page carries `page` top-level comments, the rest hides behind chained stubs
+    first, rest = tops[:page], tops[page:]
+    node = first
+    while rest:
+        chunk, rest = rest[:100], rest[100:]
+        stub = {"more": chunk}
+        node.append(stub)
+        node = stub["more"]
+    return {"id": sid, "title": f"thread {sid}", "selftext": "", "comments": first}
+
+def run(data, latency):
+    requests = Requests(latency)
+    start = time.perf_counter()
+    old = legacy_bodies(FakeSubmission(data, requests))
+    old_s, old_n = time.perf_counter() - start, requests.count
+
+    requests = Requests(latency)
+    start = time.perf_counter()
+    new = harvest_comments(FakeSubmission(data, requests))
+    new_s, new_n = time.perf_counter() - start, requests.count
+
+    # the harvest is a prefix of the legacy candidates; it just stops once there's enough text
+    assert new == old[:len(new)], data["id"]
+    print(f"{data['id']:>12}: legacy {old_n:4d} requests {old_s:7.3f}s | bounded {new_n:4d} requests {new_s:7.3f}s"
+          f" | {len(new)}/{len(old)} candidates")
+
+if __name__ == "__main__":
+    latency = 0.05  # rough per-request round trip to reddit
+    if len(sys.argv) > 1:
+        for path in sys.argv[1:]:
+            with open(path, "r", encoding="utf-8") as f:
+                run(json.load(f), latency)
+    else:
+        rng = random.Random(1234)
+        for sid, top_level in (("small", 30), ("medium", 250), ("askreddit", 2000)):
+            run(synthetic_thread(rng, sid, top_level), latency)
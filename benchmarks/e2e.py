@@ -0,0 +1,261 @@
+# python -m benchmarks.e2e [--out report.json] [--compare baseline.json] [--alignment tts|script|whisper]
+#                           [--whisper fake|tiny|base]
+# Runs every pipeline stage on short, medium and long stories with local stand-ins for Reddit,
+# OpenAI, ElevenLabs and YouTube, so a change to rendering, subtitles, TTS assembly or
+# censoring can be timed on any Linux box without credentials.
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from io import BytesIO
+from types import SimpleNamespace
+
+FIXTURES = {"short": 800, "medium": 2000, "long": 3400}
+STAGES = ("fetch", "narrate", "transcribe", "render", "upload")
+WORDS = ("the house was quiet when I got home that night and my sister said she heard someone in "
+         "the basement again so we went down together with a flashlight but the door was locked "
+         "from the inside which made no sense because nobody had a key except our landlord damn").split()
+FONT_CANDIDATES = ["/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", "/usr/share/fonts/TTF/DejaVuSans.ttf",
+                   "/Library/Fonts/Arial.ttf", "C:/Windows/Fonts/arial.ttf"]
+
+def story_text(rng, length):
+    out = []
+    while sum(len(w) + 1 for w in out) < length:
+        sentence = [rng.choice(WORDS) for _ in range(rng.randint(6, 16))]
+        sentence[0] = sentence[0].capitalize()
+        out.extend(sentence[:-1] + [sentence[-1] + "."])
+    return " ".join(out)[:length].rsplit(" ", 1)[0] + "."
+
+class FakeSubmission:
+    def __init__(self, sid, title, selftext, subreddit):
+        self.id = sid
+        self.title = title
+        self.selftext = selftext
+        self.stickied = False
+        self.over_18 = False
+        self.subreddit = SimpleNamespace(display_name=subreddit)
+        self.author = SimpleNamespace(name="benchmark_user")
+
+class FakeReddit:
+    def __init__(self):
+        self.listings = {}
+
+    def subreddit(self, name):
+        return SimpleNamespace(top=lambda limit=20, time_filter="week": list(self.listings.get(name, []))[:limit])
+
+class FakeOpenAI:
+    # the rewrite hands back the original story, so every run narrates the same text
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, temperature):
+        time.sleep(self.latency)
+        prompt = messages[-1]["content"]
+        if prompt.startswith("Here's a Reddit story:\n\n") and "Reword this story" in prompt:
+            content = prompt[len("Here's a Reddit story:\n\n"):].split("\n\nReword this story")[0]
+        elif "guess the gender" in prompt:
+            content = "Male"
+        else:
+            content = "What is the scariest thing that happened in your house?"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+class FakeSpeech:
+    # one tone per word at roughly ElevenLabs' pace, encoded to mp3 once per chunk text; with
+    # timestamps=True it also returns character timings like the with-timestamps endpoint
+    def __init__(self, latency=0.0, timestamps=False):
+        self.latency = latency
+        self.timestamps = timestamps
+        self.cache = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, text, voice, model):
+        from pydub import AudioSegment
+        from pydub.generators import Sine
+        time.sleep(self.latency)
+        with self.lock:
+            if text in self.cache:
+                return self.cache[text] if self.timestamps else self.cache[text][0]
+        speech = AudioSegment.silent(duration=0, frame_rate=44100)
+        alignment = {"characters": [], "character_start_times_seconds": [], "character_end_times_seconds": []}
+        for i, word in enumerate(text.split()):
+            duration = 55 * len(word) + 60
+            if i:
+                self.spoken(alignment, " ", len(speech) - 60, 60)
+            self.spoken(alignment, word, len(speech), duration)
+            speech += Sine(180 + 20 * (i % 7)).to_audio_segment(duration=duration).apply_gain(-12)
+            speech += AudioSegment.silent(duration=60, frame_rate=44100)
+        buf = BytesIO()
+        speech.set_frame_rate(44100).export(buf, format="mp3")
+        with self.lock:
+            self.cache[text] = (buf.getvalue(), alignment)
+        return self.cache[text] if self.timestamps else self.cache[text][0]
+
+    @staticmethod
+    def spoken(alignment, chars, start_ms, duration_ms):
+        step = duration_ms / len(chars) / 1000
+        for j, ch in enumerate(chars):
+            alignment["characters"].append(ch)
+            alignment["character_start_times_seconds"].append(start_ms / 1000 + j * step)
+            alignment["character_end_times_seconds"].append(start_ms / 1000 + (j + 1) * step)
+
+def fake_transcriber(texts):
+    # words of the narrated script spread evenly over the audio, like a perfect recogniser
+    def transcribe(audio_path, model_name="base"):
+        from audiobuffer import duration as audio_duration
+        words = texts[audio_path].split()
+        duration = audio_duration(audio_path)
+        step = duration / max(len(words), 1)
+        return [{"text": w, "start": i * step, "end": (i + 0.8) * step} for i, w in enumerate(words)]
+    return transcribe
+
+def make_media(ffmpeg, folder, size, clips, clip_seconds):
+    gameplay = os.path.join(folder, "gameplay", "Satisfy")
+    os.makedirs(gameplay, exist_ok=True)
+    w, h = size
+    for i in range(clips):
+        path = os.path.join(gameplay, f"clip{i}.mp4")
+        if not os.path.exists(path):
+            subprocess.run([ffmpeg, "-y", "-loglevel", "error", "-f", "lavfi",
+                            "-i", f"testsrc2=size={w}x{h}:rate=30:duration={clip_seconds}",
+                            "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", path], check=True)
+    music = os.path.join(folder, "music.mp3")
+    if not os.path.exists(music):
+        subprocess.run([ffmpeg, "-y", "-loglevel", "error", "-f", "lavfi", "-i", "sine=frequency=220:duration=30",
+                        "-c:a", "libmp3lame", music], check=True)
+    return os.path.join(folder, "gameplay"), music
+
+def setup_env(folder, font):
+    os.environ.update({
+        "ARIAL_FONT_LOCATION": font, "LUCKY_FONT_LOCATION": font,
+        "SAVE_FOLDER_LOCATION": os.path.join(folder, "out"),
+        "OPENAI_API_KEY": "offline", "ELEVEN_API_KEY": "offline", "BAD_WORDS": "damn",
+        "REDDIT_CLIENT_ID": "offline", "REDDIT_CLIENT_SECRET": "offline", "REDDIT_USER_AGENT": "benchmark",
+        "STORY_POOL_PATH": os.path.join(folder, "story_pool.json"),
+        "STORY_STATE_PATH": os.path.join(folder, "story_state.db"),
+        "MEDIA_INDEX_PATH": os.path.join(folder, "media_index.json"),
+        "METRICS_PATH": os.path.join(folder, "metrics.jsonl"),
+        # nothing may be served from a cache, or the stages wouldn't be measured
+        "TTS_CACHE_FOLDER": "", "LLM_CACHE_FOLDER": "", "COMMENT_CACHE_FOLDER": "",
+    })
+
+def stage_records(metrics_path, sid):
+    records = {}
+    if not os.path.exists(metrics_path):
+        return records
+    with open(metrics_path, "r", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if record.get("type") == "stage" and record.get("story") == sid and record["stage"] not in STAGES:
+                entry = records.setdefault(record["stage"], {"wall_s": 0.0, "process_cpu_s": 0.0})
+                entry["wall_s"] += record["wall_s"]
+                entry["process_cpu_s"] += record["process_cpu_s"]
+    return records
+
+def run_fixture(main, name, text, repeat, texts, metrics_path):
+    best = {}
+    for r in range(repeat):
+        sid = f"bench_{name}_{r}_{int(time.time())}"
+        main.story_pool.reddit.listings["nosleep"] = [FakeSubmission(sid, f"{name} story", text, "nosleep")]
+        main.story_pool.refresh(force=True)
+        timings = {}
+        start = time.perf_counter()
+        story = main.fetch_story(0)
+        timings["fetch"] = time.perf_counter() - start
+        texts[story["story_audio_path"]] = story["story"]
+        for stage, fn in (("narrate", main.narrate_story), ("transcribe", main.transcribe_story),
+                          ("render", main.render_story), ("upload", main.upload_story)):
+            t = time.perf_counter()
+            story = fn(story)
+            timings[stage] = time.perf_counter() - t
+        timings["total"] = time.perf_counter() - start
+        for stage, entry in stage_records(metrics_path, sid).items():
+            timings[stage] = entry["wall_s"]
+        # best of the repeats: the least noisy estimate of what the code costs
+        for k, v in timings.items():
+            best[k] = min(best.get(k, v), v)
+    return {k: round(v, 3) for k, v in best.items()}
+
+def print_report(report, baseline=None):
+    columns = list(STAGES) + ["total"]
+    extra = sorted({k for r in report["fixtures"].values() for k in r} - set(columns))
+    print(f"{'':>20}" + "".join(f"{f:>12}" for f in report["fixtures"]))
+    for stage in columns + extra:
+        cells = []
+        for fixture, timings in report["fixtures"].items():
+            value = timings.get(stage)
+            cell = "-" if value is None else f"{value:.2f}s"
+            old = baseline and baseline["fixtures"].get(fixture, {}).get(stage)
+            if value is not None and old:
+                cell += f" {100 * (value - old) / old:+.0f}%"
+            cells.append(f"{cell:>12}")
+        print(f"{stage:>20}" + "".join(cells))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline end-to-end pipeline benchmark.")
+    parser.add_argument("--work", help="folder for media and outputs (kept between runs to reuse the clips)")
+    parser.add_argument("--fixtures", default="short,medium,long")
+    parser.add_argument("--repeat", type=int, default=2)
+    parser.add_argument("--alignment", default="tts", choices=("tts", "script", "whisper"),
+                        help="where subtitle timings come from (see ALIGNMENT in main.py)")
+    parser.add_argument("--whisper", default="fake", help="'fake' or a Whisper model name, for --alignment whisper")
+    parser.add_argument("--size", default="1080x1920")
+    parser.add_argument("--font", default=next((f for f in FONT_CANDIDATES if os.path.exists(f)), None))
+    parser.add_argument("--service-latency", type=float, default=0.0, help="seconds added to each fake API call")
+    parser.add_argument("--out", help="write the report as JSON")
+    parser.add_argument("--compare", help="earlier --out report to diff against")
+    args = parser.parse_args()
+    if not args.font:
+        sys.exit("No TrueType font found, pass --font")
+
+    folder = args.work or tempfile.mkdtemp(prefix="e2e-")
+    setup_env(folder, args.font)
+    os.environ.setdefault("PROXY_CACHE_FOLDER", "")
+    from moviepy.config import FFMPEG_BINARY
+    size = tuple(int(v) for v in args.size.split("x"))
+    gameplay_folder, music_path = make_media(FFMPEG_BINARY, folder, size, clips=5, clip_seconds=60)
+    os.environ["ROOT_GAMEPLAY_FOLDER"] = gameplay_folder
+    os.environ["PROXY_SIZE"] = args.size
+    os.environ["ALIGNMENT"] = args.alignment
+
+    import main
+    from story_pool import StoryPool
+    from youtube_upload import Uploader
+    from benchmarks.upload import StandIn, LocalSession
+
+    server = StandIn()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    texts = {}
+    main.reddit = FakeReddit()
+    main.story_pool = StoryPool(main.reddit, os.environ["STORY_POOL_PATH"], subreddits=["nosleep"])
+    main.client = FakeOpenAI(args.service_latency)
+    main.generate = FakeSpeech(args.service_latency, timestamps=args.alignment == "tts")
+    main.pick_music = lambda scary: music_path
+    main.youtube_uploader = Uploader(LocalSession(), os.path.join(folder, "upload_sessions"),
+                                     upload_url=f"{server.url}/upload/youtube/v3/videos",
+                                     thumbnail_url=f"{server.url}/upload/youtube/v3/thumbnails/set")
+    if args.whisper == "fake":
+        main.transcribe_audio = fake_transcriber(texts)
+    else:
+        main.transcribe_audio = lambda path, model_name=args.whisper, f=main.transcribe_audio: f(path, model_name)
+
+    rng = random.Random(42)
+    report = {"settings": {k: v for k, v in vars(args).items() if k not in ("out", "compare")}, "fixtures": {}}
+    for name in args.fixtures.split(","):
+        report["fixtures"][name] = run_fixture(main, name, story_text(rng, FIXTURES[name]), args.repeat, texts,
+                                               os.environ["METRICS_PATH"])
+    server.shutdown()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
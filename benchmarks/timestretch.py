@@ -0,0 +1,37 @@
+# python -m benchmarks.timestretch
+import time
+
+import numpy as np
+from pydub import AudioSegment
+from pydub.effects import speedup
+
+from timestretch import speedup_segment
+
+def synthetic_speech(seconds, rate=44100, seed=0):
+    # a gliding harmonic "voice" with syllable-rate amplitude bursts
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * rate)) / rate
+    f0 = 120 + 25 * np.sin(2 * np.pi * 0.4 * t) + rng.normal(0, 1, len(t)).cumsum() / rate
+    phase = 2 * np.pi * np.cumsum(f0) / rate
+    voice = sum(np.sin(h * phase) / h for h in range(1, 10))
+    envelope = np.clip(np.sin(2 * np.pi * 3.5 * t), 0, None) ** 2
+    samples = (0.3 * voice * envelope * 32767).astype(np.int16)
+    return AudioSegment(samples.tobytes(), sample_width=2, frame_rate=rate, channels=1)
+
+def old_speedup(seg):
+    out = speedup(seg, 1.20)
+    return out.set_frame_rate(44100).set_sample_width(2).set_channels(1)
+
+def timed(fn, seg):
+    start = time.perf_counter()
+    out = fn(seg)
+    return out, time.perf_counter() - start
+
+if __name__ == "__main__":
+    print(f"{'input':>6} | {'pydub speedup':>14} | {'numpy wsola':>12} | {'x faster':>8} | {'length diff':>11}")
+    for minutes in (1, 5, 10):
+        seg = synthetic_speech(minutes * 60)
+        old, old_s = timed(old_speedup, seg)
+        new, new_s = timed(speedup_segment, seg)
+        diff = (len(new) - len(old)) / len(old) * 100
+        print(f"{minutes:>4}m | {old_s:>13.2f}s | {new_s:>11.2f}s | {old_s / new_s:>7.1f}x | {diff:>+10.3f}%")
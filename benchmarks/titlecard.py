@@ -0,0 +1,82 @@
+# python -m benchmarks.titlecard [--font path/to/font.ttf]
+# Renders the title segment (card over a 1080x1920 background) with the old per-frame
+# ImageClip + Resize + FadeIn/FadeOut chain and with titlecard's pre-rendered frames.
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from moviepy import ColorClip, CompositeVideoClip, ImageClip
+from moviepy.video.fx import FadeIn, FadeOut, Resize
+
+from titlecard import animation, cached_animation, compose_card, templates
+
+FONT_CANDIDATES = ["/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", "/usr/share/fonts/TTF/DejaVuSans.ttf",
+                   "/Library/Fonts/Arial.ttf", "C:/Windows/Fonts/arial.ttf"]
+TITLE = "What is the scariest thing that ever happened to you in a house you lived in?"
+
+def resize_card(path, duration):
+    # the chain compose_video used before
+    return (ImageClip(path)
+            .with_duration(duration)
+            .with_position('center')
+            .with_effects([Resize(lambda t: 0.35 + 0.08 * (t / duration)), FadeIn(0.3), FadeOut(0.3)]))
+
+def animated_card(path, duration, fps):
+    return animation(path, duration, fps).clip().with_position('center')
+
+def card_frames(card, duration, fps):
+    # just the card's image and mask, the part the two paths do differently
+    for k in range(int(duration * fps)):
+        card.get_frame(k / fps)
+        card.mask.get_frame(k / fps)
+
+def composite(card, duration, size):
+    background = ColorClip(size, color=(40, 60, 80), duration=duration)
+    return CompositeVideoClip([background, card.with_start(0)])
+
+def render_frames(video, duration, fps):
+    for k in range(int(duration * fps)):
+        video.get_frame(k / fps)
+
+def differences(old, new, duration, fps, every=5):
+    diffs = [np.abs(old.get_frame(k / fps).astype(np.int16) - new.get_frame(k / fps).astype(np.int16))
+             for k in range(0, int(duration * fps), every)]
+    return max(int(d.max()) for d in diffs), float(np.mean([d.mean() for d in diffs]))
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - start
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Title card animation benchmark.")
+    parser.add_argument("--font", default=next((f for f in FONT_CANDIDATES if os.path.exists(f)), None))
+    parser.add_argument("--fps", type=int, default=30)
+    args = parser.parse_args()
+    size = (1080, 1920)
+    path = os.path.join(tempfile.mkdtemp(), "titlecard.png")
+
+    templates.cache_clear()
+    _, first = timed(lambda: compose_card(TITLE, font_path=args.font).save(path))
+    _, again = timed(lambda: compose_card("[FULL STORY] " + TITLE, font_path=args.font).save(path + ".full.png"))
+    print(f"card PNG: first {first * 1000:.0f} ms (loads the templates), next {again * 1000:.0f} ms")
+
+    # card: the card's image and mask on their own; segment: the card composited over a
+    # 1080x1920 background, where MoviePy's blending costs the same either way
+    print(f"{'title':>6} | {'card Resize':>11} | {'card frames':>11} | {'segment old':>11} | "
+          f"{'segment new':>11} | {'max diff':>8} | {'mean diff':>9} | {'memory':>7}")
+    for duration in (3.0, 6.0):
+        cached_animation.cache_clear()
+        _, card_old_s = timed(card_frames, resize_card(path, duration), duration, args.fps)
+        _, card_new_s = timed(card_frames, animated_card(path, duration, args.fps), duration, args.fps)
+        old = composite(resize_card(path, duration), duration, size)
+        _, old_s = timed(render_frames, old, duration, args.fps)
+        cached_animation.cache_clear()
+        new = composite(animated_card(path, duration, args.fps), duration, size)
+        _, new_s = timed(render_frames, new, duration, args.fps)
+        worst, mean = differences(old, new, duration, args.fps)
+        mb = animation(path, duration, args.fps).nbytes / 2**20
+        print(f"{duration:>5.0f}s | {card_old_s:>10.2f}s | {card_new_s:>10.2f}s | {old_s:>10.2f}s | "
+              f"{new_s:>10.2f}s | {worst:>8} | {mean:>9.3f} | {mb:>5.0f}MB")
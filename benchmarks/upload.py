@@ -0,0 +1,199 @@
+# python -m benchmarks.upload
+# Exercises youtube_upload.Uploader against a local stand-in for YouTube's resumable upload
+# endpoint, with dropped connections and a process "crash" half way through an upload.
+import contextlib
+import http.client
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlencode, urlsplit
+
+from youtube_upload import Uploader
+
+class StandIn(ThreadingHTTPServer):
+    # drop_every: every n-th chunk is cut off after half its bytes arrived
+    def __init__(self, drop_every=0, bandwidth=0):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.drop_every = drop_every
+        self.bandwidth = bandwidth
+        self.sessions = {}
+        self.videos = {}
+        self.thumbnails = {}
+        self.chunks = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status, headers=None, body=b""):
+        self.send_response(status)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length)
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        body = self.read_body()
+        if path.endswith("/thumbnails/set"):
+            self.server.thumbnails[self.path] = len(body)
+            return self.reply(200, body=b"{}")
+        sid = uuid.uuid4().hex
+        self.server.sessions[sid] = {"total": int(self.headers["X-Upload-Content-Length"]), "data": bytearray(),
+                                     "meta": json.loads(body)}
+        self.reply(200, {"Location": f"{self.server.url}/session/{sid}"})
+
+    def do_PUT(self):
+        session = self.server.sessions.get(urlsplit(self.path).path.rsplit("/", 1)[1])
+        if session is None:
+            return self.reply(404)
+        content_range = self.headers["Content-Range"]
+        length = int(self.headers.get("Content-Length", 0))
+        if not content_range.startswith("bytes */"):
+            start = int(content_range.split(" ")[1].split("-")[0])
+            with self.server.lock:
+                self.server.chunks += 1
+                drop = self.server.drop_every and self.server.chunks % self.server.drop_every == 0
+            if drop:
+                self.rfile.read(length // 2)
+                self.close_connection = True
+                self.connection.shutdown(2)
+                return
+            data = self.rfile.read(length)
+            if self.server.bandwidth:
+                time.sleep(len(data) / self.server.bandwidth)
+            if start == len(session["data"]):
+                session["data"] += data
+        if len(session["data"]) == session["total"]:
+            vid = uuid.uuid4().hex[:11]
+            self.server.videos[vid] = bytes(session["data"])
+            return self.reply(200, {"Content-Type": "application/json"}, json.dumps({"id": vid}).encode())
+        headers = {"Range": f"bytes=0-{len(session['data']) - 1}"} if session["data"] else {}
+        self.reply(308, headers)
+
+class Response:
+    def __init__(self, status, headers, body):
+        self.status_code = status
+        self.headers = headers
+        self.text = body.decode("utf-8", "replace")
+
+    def json(self):
+        return json.loads(self.text)
+
+class LocalSession:
+    # the slice of requests.Session the uploader uses, over http.client, one connection per call
+    def request(self, method, url, params=None, headers=None, data=None, timeout=None):
+        parts = urlsplit(url)
+        path = parts.path + ("?" + urlencode(params) if params else (("?" + parts.query) if parts.query else ""))
+        conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=timeout)
+        try:
+            conn.request(method, path, body=data, headers=headers or {})
+            response = conn.getresponse()
+            return Response(response.status, dict(response.getheaders()), response.read())
+        except http.client.HTTPException as e:
+            raise ConnectionError(str(e))
+        finally:
+            conn.close()
+
+class Crash(Exception):
+    pass
+
+class CrashingSession(LocalSession):
+    # dies like a killed process after `after` chunk uploads
+    def __init__(self, after):
+        self.after = after
+
+    def request(self, method, url, **kwargs):
+        if method == "PUT" and not kwargs["headers"]["Content-Range"].startswith("bytes */"):
+            if self.after == 0:
+                raise Crash()
+            self.after -= 1
+        return super().request(method, url, **kwargs)
+
+def make_files(folder, sizes_mb):
+    paths = []
+    for i, mb in enumerate(sizes_mb):
+        path = os.path.join(folder, f"video_part{i + 1}.mp4")
+        with open(path, "wb") as f:
+            f.write(os.urandom(mb << 20))
+        paths.append(path)
+    return paths
+
+def quiet():
+    # the uploader reports progress per chunk; keep the report readable
+    return contextlib.redirect_stdout(io.StringIO())
+
+def uploader(server, session, folder, chunk_mb):
+    return Uploader(session, os.path.join(folder, "sessions"), chunk_size=chunk_mb << 20, backoff=0.05,
+                    upload_url=f"{server.url}/upload/youtube/v3/videos",
+                    thumbnail_url=f"{server.url}/upload/youtube/v3/thumbnails/set")
+
+def check(server, paths, responses):
+    for path, response in zip(paths, responses):
+        with open(path, "rb") as f:
+            assert server.videos[response["id"]] == f.read(), path
+
+def run(label, sizes_mb, chunk_mb, workers, drop_every=0, bandwidth=40 << 20):
+    folder = tempfile.mkdtemp()
+    server = StandIn(drop_every, bandwidth)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        paths = make_files(folder, sizes_mb)
+        jobs = [(p, {"snippet": {"title": os.path.basename(p)}}) for p in paths]
+        up = uploader(server, LocalSession(), folder, chunk_mb)
+        start = time.perf_counter()
+        with quiet():
+            responses = up.upload_many(jobs, workers)
+        elapsed = time.perf_counter() - start
+        check(server, paths, responses)
+        print(f"{label:>34}: {elapsed:6.2f}s  {sum(sizes_mb) / elapsed:6.1f} MB/s  {server.chunks} chunk requests")
+    finally:
+        server.shutdown()
+        shutil.rmtree(folder)
+
+def run_resume(size_mb=64, chunk_mb=4):
+    folder = tempfile.mkdtemp()
+    server = StandIn()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        path, = make_files(folder, [size_mb])
+        body = {"snippet": {"title": "resume"}}
+        with quiet():
+            try:
+                uploader(server, CrashingSession(after=10), folder, chunk_mb).upload(path, body)
+            except Crash:
+                pass
+            before = server.chunks
+            response = uploader(server, LocalSession(), folder, chunk_mb).upload(path, body)
+        check(server, [path], [response])
+        print(f"{'resume after crash':>34}: {before} chunks before the crash, "
+              f"{server.chunks - before} after (of {size_mb // chunk_mb})")
+    finally:
+        server.shutdown()
+        shutil.rmtree(folder)
+
+if __name__ == "__main__":
+    sizes = [160, 60]
+    run("one request per file, sequential", sizes, 256, 1)
+    run("8 MB chunks, sequential", sizes, 8, 1)
+    run("8 MB chunks, 2 parts at once", sizes, 8, 2)
+    run("8 MB chunks, every 5th dropped", sizes, 8, 2, drop_every=5)
+    run_resume()
@@ -0,0 +1,129 @@
+import re
+
+def clean_text(text):
+    text = re.sub(r"\*", '', text)
+    text = re.sub(r'https?://\S+|www\.\S+', '', text)
+    return text
+
+SENSITIVE_TERMS = {
+    "rape": "SA",
+    "rapist": "SA-er",
+    "raped": "SA'd",
+    "rapes": "SA's",
+    "bomb": "payload",
+    "bombs": "payloads",
+    "bombed": "attacked",
+    "bombing": "attacking",
+    "asshole": "a-hole",
+    "assholes": "a-holes",
+    "incest": "inappropriate family relations",
+    "suicide": "unalive",
+    "kill": "unalive",
+    "killed": "unalived",
+    "killing": "unaliving",
+    "kills": "unalives",
+    "suicidal": "depressed",
+    "self-harm": "SH",
+    "overdose": "OD",
+    "overdosed": "OD'd",
+    "molest": "touch",
+    "molested": "touched",
+    "molester": "creep",
+    "molestation": "touching",
+    "murder": "unalive",
+    "murdered": "unalived",
+    "murdering": "unaliving",
+    "murders": "unalives",
+    "corpse": "body",
+    "sex": "fun time",
+    "porn": "explicit content",
+    "pedophile": "child predator",
+    "pedophilia": "child predation",
+    "terrorism": "extremism",
+    "terrorist": "extremist",
+    "terrorists": "extremists"
+}
+
+def censor_sensitive(text, terms=SENSITIVE_TERMS):
+    pattern_pairs = [
+        (re.compile(rf'\b{re.escape(term)}\b', re.IGNORECASE), replacement)
+        for term, replacement in terms.items()
+    ]
+    for oldword,newword in pattern_pairs:
+        text = oldword.sub(newword, text)
+    return text
+
+def mask_root(word, bad_roots):
+    for root in bad_roots:
+        index = word.lower().find(root)
+        if index != -1:
+            censored = (
+                word[:index] +  # prefix
+                word[index] + '*' * (len(root) - 1) +  # censored root
+                word[index + len(root):]  # suffix
+            )
+            return censored
+    return word
+
+def censor(text, bad_roots):
+    pattern = re.compile(
+        r'\w*(' + '|'.join(re.escape(root) for root in bad_roots) + r')\w*',
+        re.IGNORECASE
+    )
+
+    return pattern.sub(lambda m: mask_root(m.group(), bad_roots), text)
+
+class CensorEngine:
+    # Same output as censor -> censor_sensitive -> clean_text, built once per word list.
+    #
+    # None of those stages can see across whitespace (roots and terms contain none, URLs
+    # end at the first space), so the text is split on whitespace runs once and every
+    # distinct chunk is cleaned on its own and memoized. Chunks that contain no root, no
+    # term, no '*' and no URL prefix are passed through without running any stage.
+    def __init__(self, bad_roots, terms=SENSITIVE_TERMS, max_cache=200000):
+        self.bad_roots = list(bad_roots)
+        self.max_cache = max_cache
+        self.cache = {}
+        # an empty root or whitespace inside a root/term breaks the per-chunk argument
+        self.exact_chunks = all(root and not re.search(r'\s', root) for root in self.bad_roots) and \
+            not any(re.search(r'\s', term) for term in terms)
+        self.root_pattern = re.compile(
+            r'\w*(' + '|'.join(re.escape(root) for root in self.bad_roots) + r')\w*',
+            re.IGNORECASE
+        )
+        self.term_patterns = [
+            (re.compile(rf'\b{re.escape(term)}\b', re.IGNORECASE), replacement)
+            for term, replacement in terms.items()
+        ]
+        self.trigger = re.compile(
+            '|'.join([re.escape(root) for root in self.bad_roots] + [re.escape(term) for term in terms] +
+                     [r'\*', r'https?://', r'www\.']),
+            re.IGNORECASE
+        )
+        self.star_pattern = re.compile(r"\*")
+        self.url_pattern = re.compile(r'https?://\S+|www\.\S+')
+        self.split_pattern = re.compile(r'(\s+)')
+
+    def clean_chunk(self, text):
+        text = self.root_pattern.sub(lambda m: mask_root(m.group(), self.bad_roots), text)
+        for oldword, newword in self.term_patterns:
+            text = oldword.sub(newword, text)
+        text = self.star_pattern.sub('', text)
+        text = self.url_pattern.sub('', text)
+        return text
+
+    def clean(self, text):
+        if not self.exact_chunks:
+            return self.clean_chunk(text)
+        cache = self.cache
+        if len(cache) > self.max_cache:
+            cache.clear()
+        parts = self.split_pattern.split(text)
+        for i in range(0, len(parts), 2):
+            chunk = parts[i]
+            cleaned = cache.get(chunk)
+            if cleaned is None:
+                cleaned = self.clean_chunk(chunk) if self.trigger.search(chunk) else chunk
+                cache[chunk] = cleaned
+            parts[i] = cleaned
+        return ''.join(parts)
@@ -0,0 +1,64 @@
+import json
+import os
+
+from fileio import write_json
+
+def is_comment(item):
+    # PRAW Comment vs MoreComments, duck-typed so recorded fixtures work the same way
+    return hasattr(item, "body")
+
+def top_level_comments(submission):
+    # top-level comments in listing order; "load more" stubs are only expanded when the
+    # walk reaches them, and reply subtrees are never touched
+    prefix = f"t3_{submission.id}"
+    queue = list(submission.comments)
+    while queue:
+        item = queue.pop(0)
+        if is_comment(item):
+            yield item
+            continue
+        expanded = [c for c in item.comments() if is_comment(c) and getattr(c, "parent_id", prefix) == prefix]
+        queue[0:0] = expanded
+
+def harvest_comments(submission, min_length=250, window=20, target=1000):
+    # qualifying bodies from the first `window` top-level comments, stopping as soon as
+    # there is enough text to reach the body target
+    bodies = []
+    total = len(submission.selftext)
+    for n, comment in enumerate(top_level_comments(submission)):
+        if n >= window or total >= target:
+            break
+        if len(comment.body) > min_length:
+            bodies.append(comment.body)
+            total += len(comment.body)
+    return bodies
+
+def cached_comment_bodies(submission, cache_dir, **harvest_args):
+    path = os.path.join(cache_dir, f"{submission.id}.json") if cache_dir else None
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    bodies = harvest_comments(submission, **harvest_args)
+    if path:
+        os.makedirs(cache_dir, exist_ok=True)
+        write_json(path, bodies)
+    return bodies
+
+def record_submission(submission, path):
+    # dump the full comment tree, with "load more" stubs kept as such, so harvesting can be
+    # benchmarked offline against a real thread (this expands everything once)
+    def node(item):
+        if is_comment(item):
+            return {"body": item.body, "parent_id": item.parent_id, "replies": [node(r) for r in item.replies]}
+        return {"more": [node(c) for c in item.comments()]}
+
+    submission.comment_sort = "top"
+    data = {
+        "id": submission.id,
+        "title": submission.title,
+        "selftext": submission.selftext,
+        "comments": [node(c) for c in submission.comments],
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    return path
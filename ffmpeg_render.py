@@ -0,0 +1,103 @@
+import math
+import os
+import subprocess
+
+def ffmpeg_binary():
+    # looked up on first use so importing this module doesn't pull in all of moviepy
+    from moviepy.config import FFMPEG_BINARY
+    return FFMPEG_BINARY
+
+def filter_path(path):
+    # paths inside a filter graph need their drive colon and quotes escaped
+    path = os.path.abspath(path).replace("\\", "/")
+    return path.replace("'", "\\'").replace(":", "\\:")
+
+def title_card_filter(source, duration, output, scale=1.0):
+    # same animation as the MoviePy path: grow from 35% to 43% of the PNG width (times scale),
+    # fading in from and out to black over 0.3s
+    return (
+        f"[{source}]format=rgba,"
+        f"scale=w='trunc(iw*{scale:g}*(0.35+0.08*t/{duration:.3f}))':h=-1:eval=frame,"
+        f"fade=t=in:st=0:d=0.3,"
+        f"fade=t=out:st={max(duration - 0.3, 0):.3f}:d=0.3[{output}]"
+    )
+
+def render_ffmpeg(gameplay_files, size, title_audio_path, story_audio_path, title_duration, total_length,
+                  music_path, titlecard_path, ass_path, font_path, output_path,
+                  codec="libx264", threads=12, bitrate="8000k", fps=30, preset="medium", ffmpeg_params=(),
+                  card_scale=1.0):
+    width, height = size
+    cmd = [ffmpeg_binary(), "-y", "-hide_banner", "-loglevel", "error"]
+    for f in gameplay_files:
+        cmd += ["-i", f]
+    n = len(gameplay_files)
+    title_in, story_in, music_in, card_in = n, n + 1, n + 2, n + 3
+    # the story audio may be a span of the narration WAV; ffmpeg seeks into it itself
+    from audiobuffer import ffmpeg_input
+    cmd += ["-i", title_audio_path] + ffmpeg_input(story_audio_path)
+    cmd += ["-stream_loop", "-1", "-i", music_path]
+    cmd += ["-loop", "1", "-framerate", str(fps), "-t", f"{title_duration:.3f}", "-i", titlecard_path]
+
+    graph = []
+    for i in range(n):
+        # fill the frame and crop the overflow, like the proxies, rather than stretch other aspect ratios
+        graph.append(f"[{i}:v]scale={width}:{height}:force_original_aspect_ratio=increase,crop={width}:{height},"
+                     f"setsar=1,fps={fps},format=yuv420p[g{i}]")
+    graph.append("".join(f"[g{i}]" for i in range(n)) +
+                 f"concat=n={n}:v=1:a=0,trim=duration={total_length:.3f},setpts=PTS-STARTPTS[bg]")
+    graph.append(title_card_filter(f"{card_in}:v", title_duration, "tc", card_scale))
+    graph.append("[bg][tc]overlay=x=(W-w)/2:y=(H-h)/2:eof_action=pass:eval=frame[withcard]")
+    graph.append(f"[withcard]ass=filename='{filter_path(ass_path)}':fontsdir='{filter_path(os.path.dirname(font_path))}',"
+                 f"format=yuv420p[v]")
+    graph.append(f"[{title_in}:a][{story_in}:a]concat=n=2:v=0:a=1[narration]")
+    graph.append(f"[{music_in}:a]volume=0.05,atrim=duration={total_length:.3f}[music]")
+    graph.append("[narration][music]amix=inputs=2:duration=first:normalize=0[a]")
+
+    cmd += ["-filter_complex", ";".join(graph), "-map", "[v]", "-map", "[a]"]
+    cmd += ["-c:v", codec, "-preset", preset, "-b:v", bitrate, "-r", str(fps), "-threads", str(threads)]
+    cmd += ["-c:a", "libmp3lame", "-ar", "44100", "-t", f"{total_length:.3f}"] + list(ffmpeg_params) + [output_path]
+
+    print(f"🎞️  Rendering with ffmpeg ({n} gameplay clips)...")
+    subprocess.run(cmd, check=True)
+    return output_path
+
+def frame_ceil(t, fps):
+    return math.ceil(t * fps - 1e-6) / fps
+
+def keyframe_params(keyframes):
+    # IDR frames at the given times, so the output can later be cut there without re-encoding
+    if not keyframes:
+        return []
+    return ["-force_key_frames", ",".join(f"{t:.3f}" for t in keyframes), "-forced-idr", "1"]
+
+def stream_cut(src, dst, start, length):
+    # output-side -ss drops packets up to the first keyframe at or after start
+    cmd = [ffmpeg_binary(), "-y", "-hide_banner", "-loglevel", "error", "-i", src,
+           "-ss", f"{start:.3f}", "-t", f"{length:.3f}", "-c", "copy", "-avoid_negative_ts", "make_zero", dst]
+    subprocess.run(cmd, check=True)
+    return dst
+
+def write_concat_list(paths, list_path):
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path in paths:
+            escaped = os.path.abspath(path).replace("\\", "/").replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+
+def concat_copy(paths, dst):
+    list_path = os.path.splitext(dst)[0] + "_concat.txt"
+    write_concat_list(paths, list_path)
+    cmd = [ffmpeg_binary(), "-y", "-hide_banner", "-loglevel", "error", "-f", "concat", "-safe", "0",
+           "-i", list_path, "-c", "copy", "-movflags", "+faststart", dst]
+    subprocess.run(cmd, check=True)
+    os.remove(list_path)
+    return dst
+
+def mux_segments(segment_paths, audio_path, output_path, total_length):
+    list_path = os.path.splitext(output_path)[0] + "_segments.txt"
+    write_concat_list(segment_paths, list_path)
+    cmd = [ffmpeg_binary(), "-y", "-hide_banner", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", list_path,
+           "-i", audio_path, "-map", "0:v", "-map", "1:a", "-c:v", "copy", "-c:a", "libmp3lame", "-ar", "44100",
+           "-t", f"{total_length:.3f}", "-movflags", "+faststart", output_path]
+    subprocess.run(cmd, check=True)
+    os.remove(list_path)
+    return output_path
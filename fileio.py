@@ -0,0 +1,30 @@
+import json
+import os
+import shutil
+import threading
+
+def temp_path(path, suffix=""):
+    # next to the target so the rename stays on one filesystem; unique per process and thread,
+    # so concurrent writers of the same file never share one. Work dir snapshots skip *.tmp
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp{suffix}"
+
+def write_atomic(path, data):
+    # write then rename, so a crash mid-write never leaves a truncated file behind
+    tmp_path = temp_path(path)
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return path
+
+def write_json(path, obj, **dump_args):
+    return write_atomic(path, json.dumps(obj, **dump_args).encode("utf-8"))
+
+def copy_atomic(src, dst):
+    tmp_path = temp_path(dst)
+    shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, dst)
+    return dst
+
+def cache_path(cache_dir, key, ext=".json"):
+    # caches keyed by a hex digest, sharded by its first two characters
+    return os.path.join(cache_dir, key[:2], key + ext)
@@ -0,0 +1,151 @@
+import cProfile
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+RUN_ENV = "INSTRUMENT_RUN_ID"
+
+metrics_path = None
+profile_dir = None
+counters = {}
+lock = threading.Lock()
+context = threading.local()
+
+def configure(path, profile=None):
+    # worker processes inherit the run id through the environment, so their records line up
+    global metrics_path, profile_dir
+    metrics_path = path
+    profile_dir = profile
+    os.environ.setdefault(RUN_ENV, time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6])
+
+def run_id():
+    return os.environ.get(RUN_ENV)
+
+def rss_mb():
+    if psutil:
+        return psutil.Process().memory_info().rss / 2**20
+    if os.path.exists("/proc/self/statm"):
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    return None
+
+def peak_rss_mb():
+    # high-water mark of this process so far
+    if resource:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+    if psutil:
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / 2**20
+    return None
+
+def children_cpu():
+    # ffmpeg and friends run as subprocesses; their CPU only shows up here once they exit
+    if resource:
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return usage.ru_utime + usage.ru_stime
+    return None
+
+def io_bytes():
+    if psutil:
+        try:
+            io = psutil.Process().io_counters()
+            return io.read_bytes, io.write_bytes
+        except (AttributeError, psutil.Error):
+            return None, None
+    if os.path.exists("/proc/self/io"):
+        with open("/proc/self/io") as f:
+            fields = dict(line.split(": ") for line in f.read().splitlines())
+        return int(fields["rchar"]), int(fields["wchar"])
+    return None, None
+
+def delta(after, before, scale=1):
+    if after is None or before is None:
+        return None
+    return round((after - before) / scale, 3)
+
+def count(service, calls=1, chars=0, cache_hits=0):
+    with lock:
+        entry = counters.setdefault(service, {"calls": 0, "chars": 0, "cache_hits": 0})
+        entry["calls"] += calls
+        entry["chars"] += chars
+        entry["cache_hits"] += cache_hits
+
+def api_totals():
+    with lock:
+        return {k: dict(v) for k, v in counters.items()}
+
+def emit(record):
+    record = dict(record, run=run_id(), pid=os.getpid(), at=time.time())
+    if not metrics_path:
+        return record
+    line = json.dumps(record) + "\n"
+    os.makedirs(os.path.dirname(metrics_path) or ".", exist_ok=True)
+    # one short append per record, so processes can share the file
+    with lock, open(metrics_path, "a", encoding="utf-8") as f:
+        f.write(line)
+    return record
+
+def measured(stage, profile=False):
+    # records wall/CPU time, memory and I/O for every call of the wrapped function; with
+    # profile=True and a profile dir configured, the call also runs under cProfile. Only
+    # thread_cpu_s is the call's own; the process_* fields include any stages running alongside,
+    # and process_peak_rss_mb is the high-water mark since the process started
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            story = getattr(context, "story", None)
+            if args and isinstance(args[0], dict) and "work_dir" in args[0]:
+                story = os.path.basename(args[0]["work_dir"])
+            previous, context.story = getattr(context, "story", None), story
+            read0, write0 = io_bytes()
+            rss0, child0 = rss_mb(), children_cpu()
+            wall0, cpu0, thread0 = time.perf_counter(), time.process_time(), time.thread_time()
+            profiler = cProfile.Profile() if profile and profile_dir else None
+            ok = False
+            try:
+                if profiler:
+                    result = profiler.runcall(fn, *args, **kwargs)
+                else:
+                    result = fn(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                read1, write1 = io_bytes()
+                record = {
+                    "type": "stage", "stage": stage, "story": story, "ok": ok,
+                    "wall_s": round(time.perf_counter() - wall0, 3),
+                    "thread_cpu_s": round(time.thread_time() - thread0, 3),
+                    "process_cpu_s": round(time.process_time() - cpu0, 3),
+                    "children_cpu_s": delta(children_cpu(), child0),
+                    "rss_start_mb": rss0 and round(rss0, 1),
+                    "rss_end_mb": rss_mb() and round(rss_mb(), 1),
+                    "process_peak_rss_mb": peak_rss_mb() and round(peak_rss_mb(), 1),
+                    "read_mb": delta(read1, read0, 2**20),
+                    "write_mb": delta(write1, write0, 2**20),
+                }
+                if profiler:
+                    os.makedirs(profile_dir, exist_ok=True)
+                    record["profile"] = os.path.join(profile_dir, f"{stage}-{story or 'run'}-{os.getpid()}.prof")
+                    profiler.dump_stats(record["profile"])
+                emit(record)
+                context.story = previous
+        return inner
+    return wrap
+
+def emit_run_summary(**fields):
+    return emit(dict(fields, type="run", api=api_totals()))
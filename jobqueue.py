@@ -0,0 +1,195 @@
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from fileio import copy_atomic
+from story_state import worker_name
+
+class LeaseLost(Exception):
+    pass
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    folder TEXT NOT NULL,
+    story TEXT NOT NULL,
+    status TEXT NOT NULL,
+    worker TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    beats INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (kind, status, id);
+"""
+
+class JobQueue:
+    # Story jobs handed between machines through one folder: queue.db holds the jobs, and
+    # every job gets a folder of files (narration for a render, videos for an upload) that is
+    # copied in before the job becomes visible and removed once it's done. On one box any
+    # folder works; across nodes it has to be a mount they share with working file locks
+    # (NFSv4, SMB). That's also why the DB keeps the rollback journal: WAL's shared-memory
+    # index only works between processes on one host.
+    #
+    # A claimed job is leased. Its worker bumps the job's heartbeat count every lease / 3
+    # seconds, and a claim gives up on a running job once that count hasn't moved for a
+    # whole lease, as timed by the claiming process's own monotonic clock; hosts never
+    # compare timestamps, so their clocks may disagree. A worker that dies loses the job
+    # that way, up to max_attempts claims; a worker that merely stalled finds out when its
+    # done() or fail() no longer matches its claim.
+    def __init__(self, root, lease=1800, max_attempts=3):
+        self.root = root
+        self.lease = lease
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.join(root, "files"), exist_ok=True)
+        self.lock = threading.Lock()
+        self.seen = {}
+        self.db = sqlite3.connect(os.path.join(root, "queue.db"), timeout=30, isolation_level=None,
+                                  check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=DELETE")
+        self.db.executescript(SCHEMA)
+
+    def stage_files(self, paths):
+        folder = uuid.uuid4().hex
+        dst = os.path.join(self.root, "files", folder)
+        os.makedirs(dst)
+        for path in paths:
+            shutil.copyfile(path, os.path.join(dst, os.path.basename(path)))
+        return folder
+
+    def insert(self, kind, story, folder, now):
+        return self.db.execute(
+            "INSERT INTO jobs (kind, folder, story, status, created_at, updated_at) VALUES (?, ?, ?, 'queued', ?, ?)",
+            (kind, folder, json.dumps(story), now, now)).lastrowid
+
+    def put(self, kind, story, paths=()):
+        folder = self.stage_files(paths)
+        with self.lock:
+            return self.insert(kind, story, folder, time.time())
+
+    def expired(self, running):
+        # ids of the (id, beats) running jobs whose heartbeat hasn't moved for a lease
+        now = time.monotonic()
+        stale = []
+        for job_id, beats in running:
+            seen = self.seen.get(job_id)
+            if seen is None or seen[0] != beats:
+                self.seen[job_id] = (beats, now)
+            elif now - seen[1] >= self.lease:
+                stale.append(job_id)
+        ids = {job_id for job_id, _ in running}
+        self.seen = {job_id: seen for job_id, seen in self.seen.items() if job_id in ids}
+        return stale
+
+    def claim(self, kind, worker=None):
+        # the oldest waiting job of this kind, after putting back the ones whose worker is gone
+        now = time.time()
+        worker = worker or worker_name()
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                running = self.db.execute("SELECT id, beats FROM jobs WHERE kind = ? AND status = 'running'",
+                                          (kind,)).fetchall()
+                for job_id in self.expired(running):
+                    # a job whose last allowed attempt died fails rather than waiting forever
+                    self.db.execute(
+                        "UPDATE jobs SET status = CASE WHEN attempts < ? THEN 'queued' ELSE 'failed' END, "
+                        "error = 'lease expired', updated_at = ? WHERE id = ?", (self.max_attempts, now, job_id))
+                row = self.db.execute(
+                    "SELECT id, folder, story, attempts FROM jobs WHERE kind = ? AND status = 'queued' "
+                    "ORDER BY id LIMIT 1", (kind,)).fetchone()
+                if row:
+                    self.db.execute(
+                        "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, updated_at = ? "
+                        "WHERE id = ?", (worker, now, row[0]))
+                self.db.execute("COMMIT")
+            except Exception:
+                self.db.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return {"id": row[0], "kind": kind, "folder": row[1], "story": json.loads(row[2]), "attempt": row[3] + 1,
+                "worker": worker}
+
+    def holds(self, job):
+        # the WHERE clause that matches a job only while this claim of it is still current
+        return ("id = ? AND status = 'running' AND worker = ? AND attempts = ?",
+                (job["id"], job["worker"], job["attempt"]))
+
+    def fetch(self, job, dest):
+        # copies the job's files into dest; returns {file name: local path}
+        src = os.path.join(self.root, "files", job["folder"])
+        os.makedirs(dest, exist_ok=True)
+        paths = {}
+        for name in os.listdir(src):
+            paths[name] = copy_atomic(os.path.join(src, name), os.path.join(dest, name))
+        return paths
+
+    def renew(self, job):
+        where, args = self.holds(job)
+        with self.lock:
+            self.db.execute(f"UPDATE jobs SET beats = beats + 1, updated_at = ? WHERE {where}", (time.time(),) + args)
+
+    @contextmanager
+    def holding(self, job):
+        # renews the lease in the background for as long as the job is being worked on
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(self.lease / 3):
+                self.renew(job)
+
+        thread = threading.Thread(target=beat, name=f"lease-{job['id']}", daemon=True)
+        thread.start()
+        try:
+            yield job
+        finally:
+            stop.set()
+            thread.join()
+
+    def done(self, job, next_kind=None, story=None, paths=()):
+        # finishing a job and queueing what comes after it is one transaction, so a worker
+        # that dies in between leaves either both or neither. A worker whose lease was taken
+        # over gets LeaseLost instead, so the job can't be finished (and uploaded) twice
+        folder = self.stage_files(paths) if next_kind else None
+        where, args = self.holds(job)
+        now = time.time()
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                held = self.db.execute(f"UPDATE jobs SET status = 'done', error = NULL, updated_at = ? WHERE {where}",
+                                       (now,) + args).rowcount
+                if held and next_kind:
+                    self.insert(next_kind, story, folder, now)
+                self.db.execute("COMMIT")
+            except Exception:
+                self.db.execute("ROLLBACK")
+                raise
+        if not held:
+            if folder:
+                shutil.rmtree(os.path.join(self.root, "files", folder), ignore_errors=True)
+            raise LeaseLost(f"job {job['id']} was taken over by another worker")
+        shutil.rmtree(os.path.join(self.root, "files", job["folder"]), ignore_errors=True)
+
+    def fail(self, job, error):
+        # back in line for another worker, until it has used up its attempts
+        where, args = self.holds(job)
+        with self.lock:
+            self.db.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts < ? THEN 'queued' ELSE 'failed' END, "
+                f"error = ?, updated_at = ? WHERE {where}", (self.max_attempts, str(error), time.time()) + args)
+
+    def counts(self):
+        with self.lock:
+            rows = self.db.execute("SELECT kind, status, COUNT(*) FROM jobs GROUP BY kind, status").fetchall()
+        counts = {}
+        for kind, status, n in rows:
+            counts.setdefault(kind, {})[status] = n
+        return counts
@@ -0,0 +1,53 @@
+import hashlib
+import json
+import os
+import time
+
+from fileio import cache_path, write_json
+from instrument import count
+
+def request_key(model, messages, temperature, submission_id=None):
+    return hashlib.sha256(json.dumps([model, messages, temperature, submission_id]).encode("utf-8")).hexdigest()
+
+def read_cached(cache_dir, key):
+    if not cache_dir:
+        return None
+    path = cache_path(cache_dir, key)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["content"]
+
+def write_cached(cache_dir, key, content):
+    if not cache_dir:
+        return
+    path = cache_path(cache_dir, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    write_json(path, {"content": content})
+
+def complete(client, model, messages, temperature, submission_id=None, cache_dir=None, retries=3, backoff=1.0):
+    # keyed on the submission too, so a re-run of the same story gets the same rewrite back
+    # instead of paying for (and narrating) a different one
+    key = request_key(model, messages, temperature, submission_id)
+    content = read_cached(cache_dir, key)
+    if content is not None:
+        count("openai", calls=0, cache_hits=1)
+        return content
+    # a cache miss always makes at least one request, whatever retries says
+    attempts = max(1, retries)
+    for attempt in range(attempts):
+        try:
+            count("openai", chars=sum(len(m["content"]) for m in messages))
+            response = client.chat.completions.create(model=model, messages=messages, temperature=temperature)
+            content = response.choices[0].message.content
+            break
+        except Exception as e:
+            if attempt == attempts - 1:
+                raise
+            wait = backoff * 2 ** attempt
+            print(f"⚠️  {model} request failed ({e}), retrying in {wait:.1f}s...")
+            time.sleep(wait)
+    # a reply without content isn't cached, so the next run asks again
+    if content is not None:
+        write_cached(cache_dir, key, content)
+    return content
@@ -1,26 +1,34 @@
-import praw
 import random
 from dotenv import load_dotenv
 import os
-from moviepy import VideoFileClip, AudioFileClip, concatenate_videoclips, ImageClip, CompositeVideoClip, concatenate_audioclips, TextClip, CompositeAudioClip
-from moviepy.video.fx import FadeIn, FadeOut, Resize
 import glob
 import time
-from PIL import Image, ImageDraw, ImageFont
 import textwrap
 # import boto3
-from elevenlabs import generate, set_api_key
-from pydub import AudioSegment
 from io import BytesIO
-import whisper_timestamped as whisper_ts
-import re
-from pydub.effects import speedup
-import google_auth_oauthlib.flow
-import googleapiclient.discovery
-from googleapiclient.http import MediaFileUpload
-from google.auth.transport.requests import Request
+import argparse
+import json
 import pickle
-from openai import OpenAI
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+from censoring import CensorEngine
+from story_pool import StoryPool, SCARY_SUBREDDITS
+from story_state import StoryState
+from comments import cached_comment_bodies
+from llm import complete
+from pipeline import Stage, run_pipeline
+from workdir import Checkpointed, completed, record, resumable, unfinished
+from jobqueue import JobQueue
+from youtube_upload import Uploader
+from instrument import configure, measured, emit_run_summary
+from ffmpeg_render import render_ffmpeg, frame_ceil, keyframe_params, stream_cut, concat_copy, mux_segments
+from tts import synthesize_chunks, timestamped_generator
+from media_index import load_index, refresh_index, plan_clips
+from proxies import ensure_proxies, parse_size
+# moviepy, pydub, PIL, numpy, Whisper and the service SDKs are imported where they're used, so
+# importing this module (and the lightweight subcommands) stays fast and offline
 #from datetime import datetime, timedelta, timezone
 random.seed(time.time())
 
@@ -33,14 +41,73 @@ amazon_id=os.getenv('AMAZON_POLLY_ACCESS')
 amazon_secret=os.getenv('AMAZON_POLLY_SECRET')
 region='us-east-2'
 gameplay_folder = os.getenv('ROOT_GAMEPLAY_FOLDER')
+# holds creepymusic/ and normalmusic/
+music_folder = os.getenv('MUSIC_FOLDER', 'D:/Videos/BackgroundM')
 arial_font_location = os.getenv('ARIAL_FONT_LOCATION')
 lucky_font_location = os.getenv('LUCKY_FONT_LOCATION')
-save_folder = os.getenv('SAVE_FOLDER_LOCATION')
-bad_words  = os.getenv("BAD_WORDS", "").split(",")
+save_folder = os.getenv('SAVE_FOLDER_LOCATION', 'output')
+bad_words = [w for w in os.getenv("BAD_WORDS", "").split(",") if w]
+censor_engines = {tuple(bad_words): CensorEngine(bad_words)}
 eleven_key = os.getenv("ELEVEN_API_KEY")
 openai_key = os.getenv("OPENAI_API_KEY")
-
-client = OpenAI(api_key=openai_key)
+# "moviepy" composites in Python, "ffmpeg" burns everything in with one native filter graph
+render_backend = os.getenv("RENDER_BACKEND", "moviepy").lower()
+tts_workers = int(os.getenv("TTS_WORKERS", "4"))
+# where subtitle timings come from: "tts" asks ElevenLabs for character timestamps, "script"
+# aligns the known script to the audio, "whisper" transcribes it (the slow original path)
+alignment_mode = os.getenv("ALIGNMENT", "tts").lower()
+# "cut" renders the full story once and cuts the short out of it, "render" encodes every part from scratch
+short_mode = os.getenv("SHORT_MODE", "cut").lower()
+# >1 splits MoviePy renders into that many time ranges encoded in parallel processes
+render_workers = int(os.getenv("RENDER_WORKERS", "1"))
+# per-stage concurrency for --batch runs; transcribe and render get their own processes
+stage_workers = {
+    "fetch": int(os.getenv("FETCH_WORKERS", "1")),
+    "narrate": int(os.getenv("NARRATE_WORKERS", "2")),
+    "transcribe": int(os.getenv("TRANSCRIBE_WORKERS", "1")),
+    "render": int(os.getenv("RENDER_JOBS", "1")),
+    "upload": int(os.getenv("UPLOAD_WORKERS", "2")),
+}
+batch_queue_size = int(os.getenv("BATCH_QUEUE_SIZE", "2"))
+render_settings = {"codec": "libx264", "threads": 12, "bitrate": "8000k", "fps": 30}
+# the preview command renders the same plan at this fraction of the size and this frame rate
+preview_scale = float(os.getenv("PREVIEW_SCALE", "0.25"))
+preview_fps = int(os.getenv("PREVIEW_FPS", "10"))
+# 1.0 for real renders; use_preview lowers it for the rest of the process
+render_scale = 1.0
+
+story_pool_path = os.getenv("STORY_POOL_PATH", "story_pool.json")
+story_state_path = os.getenv("STORY_STATE_PATH", "story_state.db")
+# coordinate / render-worker / upload-worker hand stories over through this folder; on
+# several machines it's a mount they all share
+job_queue_folder = os.getenv("JOB_QUEUE_FOLDER", os.path.join(save_folder, "queue"))
+job_lease = int(os.getenv("JOB_LEASE_SECONDS", "1800"))
+media_index_path = os.getenv("MEDIA_INDEX_PATH", "media_index.json")
+# background clips are transcoded once to the output size/fps; set PROXY_CACHE_FOLDER= to read sources directly
+proxy_cache_folder = os.getenv("PROXY_CACHE_FOLDER", os.path.join(save_folder, "proxies"))
+proxy_size = parse_size(os.getenv("PROXY_SIZE", "1080x1920"))
+tts_cache_folder = os.getenv("TTS_CACHE_FOLDER", os.path.join(save_folder, "tts_cache"))
+llm_cache_folder = os.getenv("LLM_CACHE_FOLDER", os.path.join(save_folder, "llm_cache"))
+llm_retries = int(os.getenv("LLM_RETRIES", "3"))
+comment_cache_folder = os.getenv("COMMENT_CACHE_FOLDER", os.path.join(save_folder, "comment_cache"))
+# session URIs of uploads in flight, so an interrupted upload resumes instead of starting over,
+# and the responses of finished ones, so they are never uploaded twice
+upload_session_folder = os.getenv("UPLOAD_SESSION_FOLDER", os.path.join(save_folder, "upload_sessions"))
+upload_chunk_mb = int(os.getenv("UPLOAD_CHUNK_MB", "8"))
+upload_part_workers = int(os.getenv("UPLOAD_PART_WORKERS", "2"))
+# one JSON record per measured call plus a summary per run
+configure(os.getenv("METRICS_PATH", os.path.join(save_folder, "metrics.jsonl")), os.getenv("PROFILE_DIR"))
+
+# service clients are built on first use; assigning these directly swaps in stand-ins
+client = None
+generate = None
+reddit = None
+story_pool = None
+story_state = None
+# the process story_state was opened in; None for a stand-in assigned from outside
+story_state_pid = None
+job_queue = None
+services_lock = threading.RLock()
 
 # polly = boto3.client(
 #     'polly',
@@ -49,15 +116,61 @@ client = OpenAI(api_key=openai_key)
 #     region_name=region
 # )
 
-set_api_key(eleven_key)
-
-reddit = praw.Reddit(client_id=id, client_secret=secret, user_agent=agent)
-
-os.makedirs(save_folder, exist_ok=True)
+def get_client():
+    global client
+    with services_lock:
+        if client is None:
+            from openai import OpenAI
+            client = OpenAI(api_key=openai_key)
+    return client
+
+def get_generate():
+    global generate
+    with services_lock:
+        if generate is None:
+            if alignment_mode == "tts":
+                generate = timestamped_generator(eleven_key)
+            else:
+                from elevenlabs import generate as eleven_generate, set_api_key
+                set_api_key(eleven_key)
+                generate = eleven_generate
+    return generate
+
+def get_reddit():
+    global reddit
+    with services_lock:
+        if reddit is None:
+            import praw
+            reddit = praw.Reddit(client_id=id, client_secret=secret, user_agent=agent)
+    return reddit
+
+def get_story_pool():
+    global story_pool
+    with services_lock:
+        if story_pool is None:
+            story_pool = StoryPool(get_reddit(), story_pool_path)
+    return story_pool
+
+def get_story_state():
+    # a SQLite connection must not be used across fork(), so a child process opens its own
+    global story_state, story_state_pid
+    with services_lock:
+        if story_state is None or story_state_pid not in (None, os.getpid()):
+            story_state, story_state_pid = StoryState(story_state_path), os.getpid()
+    return story_state
+
+def get_job_queue():
+    global job_queue
+    with services_lock:
+        if job_queue is None:
+            job_queue = JobQueue(job_queue_folder, job_lease)
+    return job_queue
 
 scopes = ["https://www.googleapis.com/auth/youtube.upload"]
 
-def authenticate_youtube():
+def youtube_credentials():
+    import google_auth_oauthlib.flow
+    from google.auth.transport.requests import Request
     creds = None
     if os.path.exists('token.pickle'):
         with open('token.pickle', 'rb') as token:
@@ -74,11 +187,22 @@ def authenticate_youtube():
         with open('token.pickle', 'wb') as token:
             pickle.dump(creds, token)
 
-    return googleapiclient.discovery.build("youtube", "v3", credentials=creds)
+    return creds
 
-def upload_video(video_path, title, description, category_id, privacy_status, upload_time, t_path):
-    youtube = authenticate_youtube()
+youtube_uploader = None
+youtube_lock = threading.Lock()
 
+def get_uploader():
+    # one authorized session per process; it refreshes its own token when it expires
+    global youtube_uploader
+    with youtube_lock:
+        if youtube_uploader is None:
+            from google.auth.transport.requests import AuthorizedSession
+            youtube_uploader = Uploader(AuthorizedSession(youtube_credentials()), upload_session_folder,
+                                        chunk_size=upload_chunk_mb << 20)
+    return youtube_uploader
+
+def video_body(title, description, category_id, privacy_status, upload_time):
     body = {
         "snippet": {
             "title": title,
@@ -95,125 +219,40 @@ def upload_video(video_path, title, description, category_id, privacy_status, up
     if privacy_status == "private" and upload_time:
         body["status"]["publishAt"] = upload_time
         print(f"⏰ Scheduled for: {upload_time}")
+    return body
 
-    media = MediaFileUpload(video_path, chunksize=-1, resumable=True, mimetype='video/mp4')
-
-    request = youtube.videos().insert(
-        part="snippet,status",
-        body=body,
-        media_body=media
-    )
-
-    response = None
-    while response is None:
-        status, response = request.next_chunk()
-        if status:
-            print(f"Uploaded {int(status.progress() * 100)}%")
-
+def finish_upload(response, t_path):
     video_id = response['id']
     print(f"✅ Upload complete: https://youtube.com/watch?v={video_id}")
 
     if t_path:
         try:
-            thumb_request = youtube.thumbnails().set(
-                videoId=video_id,
-                media_body=MediaFileUpload(t_path)
-            )
-            thumb_response = thumb_request.execute()
+            get_uploader().set_thumbnail(video_id, t_path)
             print("🖼️  Thumbnail uploaded successfully.")
         except Exception as e:
             print("⚠️  Thumbnail upload failed:", e)
+    return video_id
 
-def clean_text(text):
-    text = re.sub(r"\*", '', text)
-    text = re.sub(r'https?://\S+|www\.\S+', '', text)
-    return text
-
-SENSITIVE_TERMS = {
-    "rape": "SA",
-    "rapist": "SA-er",
-    "raped": "SA'd",
-    "rapes": "SA's",
-    "bomb": "payload",
-    "bombs": "payloads",
-    "bombed": "attacked",
-    "bombing": "attacking",
-    "asshole": "a-hole",
-    "assholes": "a-holes",
-    "incest": "inappropriate family relations",
-    "suicide": "unalive",
-    "kill": "unalive",
-    "killed": "unalived",
-    "killing": "unaliving",
-    "kills": "unalives",
-    "suicidal": "depressed",
-    "self-harm": "SH",
-    "overdose": "OD",
-    "overdosed": "OD'd",
-    "molest": "touch",
-    "molested": "touched",
-    "molester": "creep",
-    "molestation": "touching",
-    "murder": "unalive",
-    "murdered": "unalived",
-    "murdering": "unaliving",
-    "murders": "unalives",
-    "corpse": "body",
-    "sex": "fun time",
-    "porn": "explicit content",
-    "pedophile": "child predator",
-    "pedophilia": "child predation",
-    "terrorism": "extremism",
-    "terrorist": "extremist",
-    "terrorists": "extremists"
-}
-
-def censor_sensitive(text, terms=SENSITIVE_TERMS):
-    pattern_pairs = [
-        (re.compile(rf'\b{re.escape(term)}\b', re.IGNORECASE), replacement)
-        for term, replacement in terms.items()
-    ]
-    for oldword,newword in pattern_pairs:
-        text = oldword.sub(newword, text)
-    return text
+def upload_video(video_path, title, description, category_id, privacy_status, upload_time, t_path):
+    body = video_body(title, description, category_id, privacy_status, upload_time)
+    response = get_uploader().upload(video_path, body)
+    return finish_upload(response, t_path)
 
 def handle_comments(submission, scary, guess):
-    body = submission.selftext
+    # sort has to be set before the first attribute access, which fetches the comment page
     submission.comment_sort = "top"
-    submission.comments.replace_more(limit=None)
-    t20 = submission.comments[:20]
-    stories = [com for com in t20 if len(com.body) > 250]
+    body = submission.selftext
+    stories = cached_comment_bodies(submission, comment_cache_folder)
     i = 1
     while len(body) < 1000:
         if not stories:
             return None, None, None, None, None
         comment = random.choice(stories)
         stories.remove(comment)
-        body += f"\n\n{i}.\n{comment.body}"
+        body += f"\n\n{i}.\n{comment}"
         i += 1
     return submission.title, body, submission.id, scary, guess
 
-def censor(text, bad_roots):
-    pattern = re.compile(
-        r'\w*(' + '|'.join(re.escape(root) for root in bad_roots) + r')\w*',
-        re.IGNORECASE
-    )
-
-    def censor_match(m):
-        word = m.group()
-        for root in bad_roots:
-            index = word.lower().find(root)
-            if index != -1:
-                censored = (
-                    word[:index] +  # prefix
-                    word[index] + '*' * (len(root) - 1) +  # censored root
-                    word[index + len(root):]  # suffix
-                )
-                return censored
-        return word
-
-    return pattern.sub(censor_match, text)
-
 # def get_random_story(x):
 #     with open("mystory.txt", "r", encoding="utf-8") as f:
 #         story = f.read().strip()
@@ -222,57 +261,56 @@ def censor(text, bad_roots):
 #     author = "DesperateTie3312"
 #     return title, story, None, 0, author
 
-def get_random_story(used_ids_path):
-    if not os.path.exists(used_ids_path):
-        open(used_ids_path, 'w').close()
-    with open(used_ids_path, 'r') as f:
-        used_ids = set(line.strip() for line in f.readlines())
-    hostsub = random.choice(['nosleep', 'scarystories', 'tifu', 'AITAH', 'stories'])
-    subreddit = reddit.subreddit(hostsub).top(limit=20, time_filter="week")
+def get_random_story(state):
+    entry = get_story_pool().pick(state)
+    # the claim is atomic, so a parallel run that picked the same post gets nothing here
+    if not entry or not state.claim(entry["id"]):
+        return None, None, None, None, None, None
+    hostsub = entry["subreddit"]
     print(hostsub)
-    scary = 1 if hostsub in ['nosleep', 'scarystories'] else 0
-    submission = random.choice([sub for sub in subreddit])
-    if len(submission.selftext) > 3500 or submission.stickied or submission.id in used_ids or submission.over_18:
-        return None, None, None, None, None
-    if submission.subreddit.display_name in ['AskReddit', 'AskMen', 'AskWomen']:
-        return handle_comments(submission, scary, "Male")
-    elif len(submission.selftext) < 600:
-        return None, None, None, None, None
-    nstory = transform_story(submission.selftext)
-    ntitle = improve_title(nstory)
-    return ntitle, nstory, submission.id, scary, submission.author.name
+    scary = 1 if hostsub in SCARY_SUBREDDITS else 0
+    if entry["comments"]:
+        result = handle_comments(get_reddit().submission(id=entry["id"]), scary, "Male")
+        if not result[0]:
+            state.release(entry["id"])
+        return result + (None,)
+    nstory = transform_story(entry["selftext"], entry["id"])
+    # title and narrator gender only depend on the rewrite, so they go out together
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        title_future = pool.submit(improve_title, nstory, entry["id"])
+        gender_future = pool.submit(guess_story_gender, nstory, entry["id"])
+        ntitle, gender = title_future.result(), gender_future.result()
+    return ntitle, nstory, entry["id"], scary, entry["author"], gender
 
 def make_phrase_clips(groups, title_length, font_path=lucky_font_location):
-    clips = []
-    for group in groups:
-        i = 0
-        for word in group["words"]:
-            word_text = " ".join([w["text"] for w in group["words"][:i+1]])
-            word_start = word["start"]
-            word_end = word["end"]
-            txt_clip = (TextClip(font=font_path,
-                                 text=word_text,
-                                 font_size=100,
-                                 color='white',
-                                 stroke_color='black',
-                                 stroke_width=10,
-                                 method='label',
-                                 duration= word_end - word_start
-                                 )
-                                 .with_position('center')
-                                 .with_start(word_start + title_length))
-            i += 1
-            clips.append(txt_clip)
-    return clips
-
-def transcribe_audio(audio_path):
-    model = whisper_ts.load_model("base")
+    from subtitles import phrase_cues, make_subtitle_layer, subtitle_style
+    cues = phrase_cues(groups, title_length)
+    if not cues:
+        return []
+    return [make_subtitle_layer(cues, font_path, subtitle_style(render_scale))]
+
+whisper_models = {}
+
+def get_whisper_model(name="base"):
+    if name not in whisper_models:
+        print(f"🧠 Loading Whisper model '{name}'...")
+        import whisper_timestamped as whisper_ts
+        whisper_models[name] = whisper_ts.load_model(name)
+    return whisper_models[name]
+
+@measured("transcribe_audio")
+def transcribe_audio(audio_path, model_name="base"):
+    import whisper_timestamped as whisper_ts
+    model = get_whisper_model(model_name)
     result = whisper_ts.transcribe(model, audio_path)
     words = []
     for segment in result["segments"]:
         words.extend(segment["words"])
     return words
 
+def rebase_words(words, offset):
+    return [dict(w, start=w["start"] - offset, end=w["end"] - offset) for w in words]
+
 def group_words(words):
     grouped = []
     i = 0
@@ -301,68 +339,85 @@ def group_words(words):
     return grouped
 
 def text_to_speech(text, output_path, voice):
-    chunks = textwrap.wrap(text, width=800, break_long_words=False, break_on_hyphens=False)
-    combined = AudioSegment.empty()
-    i = 1
-    for chunk in chunks:
-        print(f"🧩 Processing chunk {i}/{len(chunks)}...")
-        # response = polly.synthesize_speech(
-        #     Text=chunk,
-        #     OutputFormat='pcm',
-        #     VoiceId='Matthew'
-        # )
-
-        # audio_bytes = BytesIO(response["AudioStream"].read())
-        # audio_chunk = AudioSegment(
-        #     data=audio_bytes.read(),
-        #     sample_width=2,
-        #     frame_rate=16000,
-        #     channels=1
-        # )
-        response = generate(
-            text=chunk,
-            voice=voice,
-            model="eleven_turbo_v2"
-        )
-        audio_chunk = AudioSegment.from_file(BytesIO(response), format="mp3")
-        combined += audio_chunk
-        i += 1
-    combined = speedup(combined, 1.20)
-    combined = combined.set_frame_rate(44100).set_sample_width(2).set_channels(1)
-    combined.export(output_path, format='wav')
-    print(f"✅ Final audio saved as {output_path}")
+    text_to_speech_many([(text, output_path)], voice)
+
+@measured("text_to_speech")
+def text_to_speech_many(jobs, voice, model="eleven_turbo_v2"):
+    # returns the spoken words of each job with their timings in the final (sped up) audio,
+    # or None for a job whose chunks came back without timestamps
+    from pydub import AudioSegment
+    from alignment import words_from_alignment, scale_words
+    from audiobuffer import PcmBuffer, write_wav
+    from timestretch import segment_to_mono, speedup_samples
+    # every chunk of every job goes through one bounded pool, so the title and the
+    # story are synthesized side by side instead of back to back
+    job_chunks = [textwrap.wrap(text, width=800, break_long_words=False, break_on_hyphens=False) for text, _ in jobs]
+    all_chunks = [chunk for chunks in job_chunks for chunk in chunks]
+    print(f"🧩 Synthesizing {len(all_chunks)} chunks with {tts_workers} workers...")
+    responses = synthesize_chunks(get_generate(), all_chunks, voice, model, cache_dir=tts_cache_folder,
+                                  workers=tts_workers, timestamps=alignment_mode == "tts")
 
-def get_music(length, scary):
-    folder ='D:/Videos/BackgroundM/creepymusic/' if scary else 'D:/Videos/BackgroundM/normalmusic/'
+    i = 0
+    job_words = []
+    for (text, output_path), chunks in zip(jobs, job_chunks):
+        job_responses = responses[i:i + len(chunks)]
+        i += len(chunks)
+        # decoded straight into one buffer, sized from the mp3s at 128 kbit/s
+        narration = PcmBuffer(44100, capacity=sum(len(r) for r, _ in job_responses) * 44100 // 16000 + 44100)
+        words = []
+        for response, alignment in job_responses:
+            audio_chunk = AudioSegment.from_file(BytesIO(response), format="mp3")
+            if audio_chunk.frame_rate != narration.rate:
+                audio_chunk = audio_chunk.set_frame_rate(narration.rate)
+            if words is not None and alignment:
+                words.extend(words_from_alignment(alignment, offset=narration.duration))
+            else:
+                words = None
+            narration.append(segment_to_mono(audio_chunk))
+        pcm = speedup_samples(narration.samples, narration.rate, 1.20, frame_rate=44100)
+        if words is not None and narration.length:
+            words = scale_words(words, len(pcm) / 44100 / narration.duration)
+        job_words.append(words)
+        write_wav(output_path, pcm, 44100)
+        print(f"✅ Final audio saved as {output_path}")
+    return job_words
+
+def pick_music(scary):
+    folder = os.path.join(music_folder, 'creepymusic' if scary else 'normalmusic')
     files = glob.glob(os.path.join(folder, "*.mp3"))
-    path = random.choice(files)
-    clips = []
-    total = 0
-    while total < length:
-        clip = AudioFileClip(path).with_volume_scaled(0.05)
-        clips.append(clip)
-        total += clip.duration
-    final = concatenate_audioclips(clips).subclipped(0, length)
+    return random.choice(files)
+
+def get_music(length, scary, path=None):
+    from moviepy import AudioFileClip
+    from moviepy.audio.fx import AudioLoop
+    path = path or pick_music(scary)
+    clip = AudioFileClip(path).with_volume_scaled(0.05)
+    final = clip.with_effects([AudioLoop(duration=length)])
     return final
 
 def choose_vid_folder(root_folder=gameplay_folder):
     subfolder = os.path.join(root_folder, "Satisfy/")
     return subfolder
 
-def get_gameplay(folder, length):
-    files = glob.glob(os.path.join(folder, "*.mp4"))
-    random.shuffle(files)
-    clips = []
-    total = 0
-    for f in files:
-        clip = VideoFileClip(f)
-        clips.append(clip)
-        total += clip.duration
-        if total >= length:
-            break
+@measured("plan_gameplay")
+def plan_gameplay(folder, length):
+    entries = refresh_index(media_index_path, folder, "*.mp4")
+    plan = plan_clips(entries, length)
+    # previews always go through proxies, or they would decode and composite full-size clips
+    cache_folder = proxy_cache_folder or (render_scale != 1 and os.path.join(save_folder, "proxies"))
+    if cache_folder:
+        plan = ensure_proxies(plan, cache_folder, render_size(), render_settings["fps"])
+    return plan
+
+@measured("get_gameplay")
+def get_gameplay(folder, length, plan=None):
+    from moviepy import VideoFileClip, concatenate_videoclips
+    plan = plan or plan_gameplay(folder, length)
+    clips = [VideoFileClip(entry["path"]) for entry in plan]
     final = concatenate_videoclips(clips).subclipped(0,length)
     return final
 
+@measured("title_card")
 def generate_title_card_png(
     title_text,
     output_path="titlecard.png",
@@ -372,30 +427,10 @@ def generate_title_card_png(
     padding=40,
     max_chars_per_line=26
 ):
-    top = Image.open("top.png")
-    middle = Image.open("middle.png")
-    bottom = Image.open("bottom.png")
-
-    lines = textwrap.wrap(title_text, width=max_chars_per_line, break_long_words=False)
-    line_height = font_size + 20
-    text_height = line_height * len(lines)
-
-    stretched_middle = middle.resize((width, text_height+80))
-
-    total_height = top.height + stretched_middle.height + bottom.height
-    canvas = Image.new("RGBA", (width, total_height))
-    canvas.paste(top, (0, 0))
-    canvas.paste(stretched_middle, (0, top.height))
-    canvas.paste(bottom, (0, top.height + stretched_middle.height))
-
-    font = ImageFont.truetype(font_path, font_size)
-    draw = ImageDraw.Draw(canvas)
-    y = top.height + padding
-    for line in lines:
-        draw.text((padding, y), line, font=font, fill="white")
-        y += line_height
-
-    canvas.save(output_path)
+    # the PNG is the thumbnail and the ffmpeg backend's input; MoviePy renders animate it via titlecard.animation
+    from titlecard import compose_card
+    card = compose_card(title_text, width, font_path, font_size, padding, max_chars_per_line)
+    card.save(output_path)
     return output_path
 
 def long_vids(words, title_duration):
@@ -443,58 +478,185 @@ def segment_by_rules(words, title_duration):
     print(f"there are {len(parts)} segments")
     return parts
 
-def export_short_version(sections, full_story, output_dir, originalAudioPath):
-    output_paths = []
-    output_paths.append(originalAudioPath)
+def short_version_audio(sections, story_audio_path):
+    # the short's narration is a span of the full one, so nothing is sliced or written
+    from audiobuffer import AudioSpan
+    audio = [story_audio_path]
     if len(sections) < 2:
-        return output_paths
-    words = sections[1]
-    start_ms = 0
-    end_ms = int(words[-1]['end'] * 1000)
-    chunk = full_story[start_ms:end_ms]
-    path = os.path.join(output_dir, "short_audio.wav")
-    chunk.export(path, format="wav")
-    output_paths.append(path)
-    return output_paths
-
-def export_audio_segments(segments, full_story, output_dir):
-    output_paths = []
+        return audio
+    end_ms = int(sections[1][-1]['end'] * 1000)
+    audio.append(AudioSpan(story_audio_path, 0, end_ms / 1000))
+    return audio
+
+def segment_audio(segments, story_audio_path):
+    from audiobuffer import AudioSpan
+    audio = []
     i = 0
     for words in segments:
         start_ms = 0 if i == 0 else int(words[0]['start'] * 1000)
-        end_ms = int(words[-1]['end'] * 1000)
-        chunk = full_story[start_ms:] if i == len(segments) - 1 else full_story[start_ms:end_ms]
-        path = os.path.join(output_dir, f"story_audio{i}.wav")
-        chunk.export(path, format="wav")
-        output_paths.append(path)
+        end = None if i == len(segments) - 1 else int(words[-1]['end'] * 1000) / 1000
+        audio.append(AudioSpan(story_audio_path, start_ms / 1000, end))
         i += 1
-    return output_paths
+    return audio
+
+# from here on an audio path may also be an AudioSpan (a time range of the narration WAV)
+def build_video_ffmpeg(title_audio_path, story_audio_path, output_path, scary, story_words,
+                       plan=None, music_path=None, keyframes=(), duration=None, titlecard_path="titlecard.png"):
+    from audiobuffer import duration as audio_duration
+    from subtitles import phrase_cues, subtitle_style, write_ass
+    title_length = audio_duration(title_audio_path)
+    total_length = duration or title_length + audio_duration(story_audio_path)
+
+    plan = plan or plan_gameplay(choose_vid_folder(), total_length)
+    gameplay_files = [entry["path"] for entry in plan]
+    size = (plan[0]["width"], plan[0]["height"])
+
+    cues = phrase_cues(group_words(story_words), title_length)
+    ass_path = write_ass(cues, os.path.splitext(output_path)[0] + ".ass", lucky_font_location, size,
+                         subtitle_style(render_scale))
+
+    render_ffmpeg(gameplay_files, size, title_audio_path, story_audio_path, title_length, total_length,
+                  music_path or pick_music(scary), titlecard_path, ass_path, lucky_font_location, output_path,
+                  ffmpeg_params=keyframe_params(keyframes), card_scale=render_scale, **render_settings)
+    print(f"Final video saved as {output_path}")
 
-def build_video(title_audio_path, story_audio_path, output_path, scary):
-    title_audio = AudioFileClip(title_audio_path)
-    story_audio = AudioFileClip(story_audio_path)
+@measured("build_video")
+def build_video(title_audio_path, story_audio_path, output_path, scary, story_words,
+                plan=None, music_path=None, keyframes=(), duration=None, titlecard_path="titlecard.png"):
+    if render_backend == "ffmpeg":
+        return build_video_ffmpeg(title_audio_path, story_audio_path, output_path, scary, story_words,
+                                  plan, music_path, keyframes, duration, titlecard_path)
+
+    if render_workers > 1 and not duration:
+        return build_video_segmented(title_audio_path, story_audio_path, output_path, scary, story_words,
+                                     plan, music_path, keyframes, titlecard_path)
+
+    final_vid = compose_video(title_audio_path, story_audio_path, scary, story_words, plan, music_path, titlecard_path)
+    if duration:
+        final_vid = final_vid.subclipped(0, duration)
+
+    # MoviePy muxes the audio through <name>TEMP_MPY_wvf_snd.mp3, in the CWD unless told
+    # otherwise; every story names its parts the same, so it goes next to the output instead
+    final_vid.write_videofile(output_path, ffmpeg_params=keyframe_params(keyframes),
+                              temp_audiofile_path=os.path.dirname(os.path.abspath(output_path)), **render_settings)
+    print(f"Final video saved as {output_path}")
 
+def compose_audio(title_audio, story_audio, scary, music_path=None):
+    from moviepy import concatenate_audioclips, CompositeAudioClip
     total_length = title_audio.duration + story_audio.duration
-    background_gameplay = get_gameplay(choose_vid_folder(),total_length)
-    music = get_music(total_length, scary)
-
-    title_card = (ImageClip('./titlecard.png')
-                .with_duration(title_audio.duration)
-                .with_position('center')
-                .with_effects([Resize(lambda t: 0.35 + 0.08 * (t / title_audio.duration)), FadeIn(0.3), FadeOut(0.3)]))
-    
-    whisper_results = transcribe_audio(story_audio_path)
-    groups = group_words(whisper_results)
-    subtitles = make_phrase_clips(groups, title_audio.duration)
+    music = get_music(total_length, scary, music_path)
 
     audio = concatenate_audioclips([title_audio, story_audio])
     final_audio = CompositeAudioClip([audio, music])
+    return final_audio
+
+def compose_video(title_audio_path, story_audio_path, scary, story_words, plan=None, music_path=None,
+                  titlecard_path="titlecard.png"):
+    from moviepy import CompositeVideoClip
+    from audiobuffer import audio_clip
+    from titlecard import animation
+    title_audio = audio_clip(title_audio_path)
+    story_audio = audio_clip(story_audio_path)
+
+    total_length = title_audio.duration + story_audio.duration
+    background_gameplay = get_gameplay(choose_vid_folder(),total_length, plan)
+    final_audio = compose_audio(title_audio, story_audio, scary, music_path)
 
-    final_vid = CompositeVideoClip([background_gameplay.with_audio(final_audio), title_card.with_start(0)] + subtitles)
+    # grows from 35% to 43% of the PNG width and fades in from and out to black over 0.3s,
+    # every frame resampled up front rather than per frame during the render
+    title_card = animation(titlecard_path, title_audio.duration, render_settings["fps"],
+                           scale=render_scale).clip().with_position('center')
 
-    final_vid.write_videofile(output_path, codec="libx264",threads=12,bitrate="8000k",fps=30)
+    groups = group_words(story_words)
+    subtitles = make_phrase_clips(groups, title_audio.duration)
+
+    return CompositeVideoClip([background_gameplay.with_audio(final_audio), title_card.with_start(0)] + subtitles)
+
+def plan_render_spans(story_words, title_length, total_length, n, fps):
+    # cut in the silences between words (and at the end of the title), snapped to the
+    # frame grid so the segments' frames line up exactly with a single-process render
+    candidates = {frame_ceil(title_length, fps)}
+    for prev, word in zip(story_words, story_words[1:]):
+        gap = title_length + (prev["end"] + word["start"]) / 2
+        candidates.add(round(gap * fps) / fps)
+    candidates = sorted(c for c in candidates if 0 < c < total_length)
+    cuts = []
+    for k in range(1, n):
+        if not candidates:
+            break
+        ideal = total_length * k / n
+        best = min(candidates, key=lambda c: abs(c - ideal))
+        if not cuts or best > cuts[-1]:
+            cuts.append(best)
+    bounds = [0] + cuts + [total_length]
+    return list(zip(bounds, bounds[1:]))
+
+@measured("render_segment")
+def render_segment(job):
+    # runs in a worker process, so it rebuilds the composition from paths and plain data
+    final_vid = compose_video(job["title_audio_path"], job["story_audio_path"], job["scary"],
+                              job["story_words"], job["plan"], job["music_path"], job["titlecard_path"])
+    # half a frame of slack so MoviePy's int(duration * fps) can't round a frame away
+    fps = job["settings"]["fps"]
+    segment = final_vid.subclipped(job["first_frame"] / fps).with_duration((job["frames"] + 0.5) / fps)
+    segment.write_videofile(
+        job["output_path"], audio=False, logger=None, ffmpeg_params=keyframe_params(job["keyframes"]), **job["settings"])
+    return job["output_path"]
+
+def build_video_segmented(title_audio_path, story_audio_path, output_path, scary, story_words,
+                          plan=None, music_path=None, keyframes=(), titlecard_path="titlecard.png"):
+    from audiobuffer import audio_clip, duration as audio_duration
+    title_length = audio_duration(title_audio_path)
+    total_length = title_length + audio_duration(story_audio_path)
+
+    # every worker has to compose the same timeline, so pick the random assets here
+    plan = plan or plan_gameplay(choose_vid_folder(), total_length)
+    music_path = music_path or pick_music(scary)
+    fps = render_settings["fps"]
+    spans = plan_render_spans(story_words, title_length, total_length, render_workers, fps)
+    settings = dict(render_settings, threads=max(1, render_settings["threads"] // len(spans)))
+    # work in frame numbers; together the segments write exactly the frames a single pass would
+    bounds = [round(start * fps) for start, _ in spans] + [int(total_length * fps)]
+    base = os.path.splitext(output_path)[0]
+    jobs = [{
+        "title_audio_path": title_audio_path, "story_audio_path": story_audio_path, "scary": scary,
+        "story_words": story_words, "plan": plan, "music_path": music_path, "titlecard_path": titlecard_path,
+        "first_frame": first, "frames": last - first, "output_path": f"{base}_seg{k}.mp4", "settings": settings,
+        "keyframes": [t - first / fps for t in keyframes if first / fps < t < last / fps],
+    } for k, (first, last) in enumerate(zip(bounds, bounds[1:]))]
+
+    print(f"🧵 Rendering {len(jobs)} segments on {render_workers} processes...")
+    # spawned like the pipeline's pools, since this may run next to other threads
+    with ProcessPoolExecutor(max_workers=render_workers, mp_context=get_context("spawn")) as pool:
+        segment_paths = list(pool.map(render_segment, jobs))
+
+    # audio is mixed once for the whole timeline so there are no encoder gaps at the joins
+    audio_path = f"{base}_audio.wav"
+    compose_audio(audio_clip(title_audio_path), audio_clip(story_audio_path), scary, music_path).write_audiofile(
+        audio_path, fps=44100, nbytes=2, codec="pcm_s16le", logger=None)
+    mux_segments(segment_paths, audio_path, output_path, total_length)
+    for path in segment_paths + [audio_path]:
+        os.remove(path)
     print(f"Final video saved as {output_path}")
 
+@measured("cut_short")
+def cut_short(full_path, output_path, title_audio_path, short_audio_path, scary, story_words,
+              plan, music_path, title_length, short_length, titlecard_path="titlecard.png"):
+    # the short is a prefix of the full render: re-render only the title segment with
+    # the short's card, then stream-copy the rest from the keyframe the full render
+    # placed at the end of the title
+    fps = render_settings["fps"]
+    head_length = frame_ceil(title_length, fps)
+    base = os.path.splitext(output_path)[0]
+    head_path, body_path = f"{base}_head.mp4", f"{base}_body.mp4"
+    build_video(title_audio_path, short_audio_path, head_path, scary, story_words,
+                plan=plan, music_path=music_path, duration=head_length, titlecard_path=titlecard_path)
+    stream_cut(full_path, body_path, head_length - 0.25 / fps, short_length - head_length)
+    concat_copy([head_path, body_path], output_path)
+    os.remove(head_path)
+    os.remove(body_path)
+    print(f"✂️  Short cut from {full_path} saved as {output_path}")
+
 def truncate_title(title, max_length = 100):
     title = title.strip()
     if len(title) <= max_length:
@@ -506,52 +668,312 @@ def truncate_title(title, max_length = 100):
 
     return cutoff
 
-def finalize(title, story, title_audio_path, fulls_audio_path, save_folder, scary, poster):
-    gender = guess_story_gender(story)
+def new_story(title, story, scary, poster, sid=None, gender=None, work_dir=save_folder):
+    return {
+        "title": title, "story": story, "scary": scary, "poster": poster, "sid": sid, "gender": gender,
+        "work_dir": work_dir,
+        "title_audio_path": os.path.join(work_dir, "title_audio.wav"),
+        "story_audio_path": os.path.join(work_dir, "story_audio.wav"),
+    }
+
+def resume_story(story):
+    # an unfinished story from an earlier run, picked up where it stopped; its claim starts a
+    # new lease, so the story pool doesn't hand it to another run meanwhile
+    if story["sid"]:
+        get_story_state().renew(story["sid"])
+    print(f"♻️  Resuming {story['work_dir']}")
+    return story
+
+@measured("fetch")
+def fetch_story(slot):
+    if isinstance(slot, dict):
+        return resume_story(slot)
+    stitle = None
+    attempts = 0
+    while not stitle and attempts < 5:
+        stitle, sstory, sid, scary, poster, gender = get_random_story(get_story_state())
+        attempts += 1
+    if not stitle:
+        print(f"⚠️  No story found for slot {slot}")
+        return None
+    # every story gets its own folder so stories in flight never share a file
+    work_dir = os.path.join(save_folder, sid or f"story{slot}")
+    # a story whose claim lapsed part-way (a crashed run, an upload that outlived the lease)
+    # comes back out of the pool; it carries on in its work dir instead of starting over there
+    earlier = sid and resumable(work_dir, "upload")
+    if earlier and earlier.get("queued"):
+        print(f"⏭️  {sid} is in the job queue already")
+        return None
+    if earlier:
+        return resume_story(earlier)
+    if sid:
+        get_story_state().advance(sid, "rewritten")
+    os.makedirs(work_dir, exist_ok=True)
+    story = new_story(clean(stitle, bad_words), clean(sstory, bad_words), scary, poster, sid, gender, work_dir)
+    record(work_dir, "fetch", story)
+    return story
+
+@measured("narrate")
+def narrate_story(story):
+    gender = story["gender"] or guess_story_gender(story["story"], story["sid"])
     print(gender)
     if gender == "Male":
         voice = random.choice(["pNInz6obpgDQGcFmaJgB", "ErXwobaYiN019PkySvjV", "VR6AewLTigWG4xSOukaG", "TX3LPaxmHKxFdv7VOQHJ", "bIHbv24MWmeRgasZH58o"])
     else:
         voice = random.choice(["FGY2WhTYpPnrIDTdsKH5", "AZnzlk1XvdvUeBnXmlld", "oWAxZDx7w5VEj9dCyTzz", "cgSgspJ2msm6clMCkdW9", "21m00Tcm4TlvDq8ikWAM"])
-    text_to_speech(title, title_audio_path, voice)
-    text_to_speech(story, fulls_audio_path, voice)
-    title_audio = AudioSegment.from_wav(title_audio_path)
-    story_audio = AudioSegment.from_wav(fulls_audio_path)
-    story_words = transcribe_audio(fulls_audio_path)
-    segments = long_vids(story_words, title_audio.duration_seconds)
-    # segments = segment_by_rules(story_words, title_audio.duration_seconds)
-    # audio_paths = export_audio_segments(segments, story_audio, save_folder)
-    audio_paths = export_short_version(segments, story_audio, save_folder, fulls_audio_path)
+    _, words = text_to_speech_many([(story["title"], story["title_audio_path"]), (story["story"], story["story_audio_path"])], voice)
+    if story["sid"]:
+        get_story_state().advance(story["sid"], "narrated")
+    story = dict(story, gender=gender)
+    if words is not None:
+        story["words"] = words
+    return story
+
+@measured("transcribe")
+def transcribe_story(story):
+    # narration usually brings its own timings; otherwise we still know the script, so
+    # aligning it is enough and Whisper is only needed when asked for
+    if story.get("words") is not None:
+        return story
+    if alignment_mode == "whisper":
+        return dict(story, words=transcribe_audio(story["story_audio_path"]))
+    from alignment import align_audio
+    return dict(story, words=align_audio(story["story_audio_path"], story["story"]))
+
+# PROFILE_DIR= also runs it under cProfile; the record carries the pid for py-spy
+@measured("render", profile=True)
+def render_story(story):
+    from audiobuffer import duration as audio_duration
+    title, scary, work_dir = story["title"], story["scary"], story["work_dir"]
+    title_audio_path, fulls_audio_path = story["title_audio_path"], story["story_audio_path"]
+    # only the WAV headers are read here; the renderers map the samples themselves
+    title_length = audio_duration(title_audio_path)
+    story_length = audio_duration(fulls_audio_path)
+    story_words = story["words"]
+    segments = long_vids(story_words, title_length)
+    # segments = segment_by_rules(story_words, title_length)
+    # audio_paths = segment_audio(segments, fulls_audio_path)
+    audio_paths = short_version_audio(segments, fulls_audio_path)
+
+    cut_parts = short_mode == "cut" and len(segments) > 1
+    plan, music_path, keyframes = None, None, ()
+    if cut_parts:
+        # both parts share one background and music bed so the short really is a prefix
+        plan = plan_gameplay(choose_vid_folder(), title_length + story_length)
+        music_path = pick_music(scary)
+        short_length = title_length + int(segments[1][-1]['end'] * 1000) / 1000
+        keyframes = (frame_ceil(title_length, render_settings["fps"]), short_length)
 
     video_paths = []
+    titlecard_path = None
+    report = {
+        "plan": "long_vids", "title_length": round(title_length, 3), "story_length": round(story_length, 3),
+        "render": {"backend": render_backend, "short_mode": short_mode, "scale": render_scale,
+                   "fps": render_settings["fps"], "keyframes": [round(t, 3) for t in keyframes]},
+        "parts": [],
+    }
     i = 0
     while i < len(segments):
         part_audio_path = audio_paths[i]
+        # every part from export_short_version starts at the top of the narration
+        part_offset = 0
+        # part_offset = 0 if i == 0 else segments[i][0]['start']
+        part_words = rebase_words(segments[i], part_offset)
         # part_title = f"{('Part ' + str(i+1) + ': ') if i > 0 else ''}{title}"
         part_title = f"{'[FULL STORY] ' if i == 0 and len(segments) > 1 else ''}{title}"
         yttitle = truncate_title(part_title)
-        generate_title_card_png(part_title)
-        part_output_path = os.path.join(save_folder, f"video_part{i+1}.mp4")
-        build_video(title_audio_path, part_audio_path, part_output_path, scary)
+        titlecard_path = generate_title_card_png(part_title, os.path.join(work_dir, f"titlecard{i+1}.png"))
+        part_output_path = os.path.join(work_dir, f"video_part{i+1}.mp4")
+        if cut_parts and i > 0:
+            cut_short(video_paths[0][0], part_output_path, title_audio_path, part_audio_path, scary, part_words,
+                      plan, music_path, title_length, short_length, titlecard_path)
+        else:
+            build_video(title_audio_path, part_audio_path, part_output_path, scary, part_words,
+                        plan=plan, music_path=music_path, keyframes=keyframes, titlecard_path=titlecard_path)
         video_paths.append((part_output_path, yttitle))
+        report["parts"].append(part_timing(part_title, titlecard_path, part_words, title_length, part_audio_path))
         i += 1
+    timing_path = report_timing(work_dir, report)
+    if story["sid"]:
+        get_story_state().advance(story["sid"], "rendered")
+    # the full story's thumbnail is the plain card of the last part
+    thumbnail_path = titlecard_path if len(video_paths) > 1 else None
+    return dict(story, videos=video_paths, thumbnail_path=thumbnail_path, timing_path=timing_path)
+
+def part_timing(title, titlecard_path, words, title_length, audio):
+    # everything about a part that has to come out the same at any size and frame rate
+    from audiobuffer import as_span, duration as audio_duration
+    from subtitles import phrase_cues
+    from timing import cue_rows
+    from titlecard import card_layout
+    span = as_span(audio)
+    return {
+        "title": title,
+        "audio": [round(span.start, 3), None if span.end is None else round(span.end, 3)],
+        "length": round(title_length + audio_duration(audio), 3),
+        "words": len(words),
+        "card": card_layout(titlecard_path, title),
+        "cues": cue_rows(phrase_cues(group_words(words), title_length)),
+    }
 
+def report_timing(work_dir, report):
+    # a preview and the real render of a story check each other's plan, whichever runs second
+    from timing import PREVIEW_FOLDER, REPORT, load_report, mismatches, print_mismatches, write_report
+    path = write_report(work_dir, report)
+    if render_scale != 1:
+        other = os.path.join(os.path.dirname(work_dir), REPORT)
+    else:
+        other = os.path.join(work_dir, PREVIEW_FOLDER, REPORT)
+    if os.path.exists(other):
+        print_mismatches(mismatches(load_report(other), report), other, path)
+    return path
+
+def render_size():
+    # yuv420p needs even dimensions
+    return tuple(max(2, round(v * render_scale / 2) * 2) for v in proxy_size)
+
+def use_preview(scale=preview_scale, fps=preview_fps):
+    # the render code reads these at call time, so a preview runs exactly the real render's
+    # code; it renders in one process, being done before a pool would have started
+    global render_scale, render_workers
+    render_scale, render_workers = scale, 1
+    bitrate = max(200, int(int(render_settings["bitrate"].rstrip("k")) * scale * scale))
+    render_settings.update(fps=fps, bitrate=f"{bitrate}k", preset="ultrafast")
+
+@measured("preview")
+def preview_story(story):
+    # render_story into the story's preview folder: the same cutoffs, cues and card layout as
+    # the real render, but nothing is recorded in the manifest or the state store, or uploaded
+    from timing import PREVIEW_FOLDER
+    preview_dir = os.path.join(story["work_dir"], PREVIEW_FOLDER)
+    os.makedirs(preview_dir, exist_ok=True)
+    return render_story(dict(story, work_dir=preview_dir, sid=None))
+
+@measured("upload")
+def upload_story(story):
     i = 0
-    title = f"\"{title}\" \n Post by u/{poster}."
-    for (vpath, vtitle) in video_paths:
+    description = f"\"{story['title']}\" \n Post by u/{story['poster']}."
+    jobs = []
+    for (vpath, vtitle) in story["videos"]:
         # privacy = "public" if i == 0 else "private"
         privacy = "public"
         uploadt = None
         # hours = 12*i
         # if i != 0:
         #     uploadt = (datetime.now(timezone.utc) + timedelta(hours=hours)).isoformat().replace("+00:00", "Z")
-        thumbnail_path = "titlecard.png" if len(video_paths) > 1 and i == 0 else None
-
         print(f"\n📝 Uploading {vtitle}...")
-        upload_video(vpath, vtitle, title, "22", privacy, uploadt, thumbnail_path)
+        jobs.append((vpath, video_body(vtitle, description, "22", privacy, uploadt)))
         i += 1
+    # the parts of a story go up side by side over the same session; each part is finished
+    # as soon as it's up, and a rerun after a failed part gets the others' videos back
+    # from their session files rather than uploading them again
+    get_uploader().upload_many(jobs, upload_part_workers, on_done=lambda i, response: finish_upload(
+        response, story["thumbnail_path"] if i == 0 else None))
+    if story["sid"]:
+        get_story_state().advance(story["sid"], "uploaded")
+    return story
+
+def finalize(title, story, title_audio_path, fulls_audio_path, save_folder, scary, poster, sid=None, gender=None):
+    # one story start to finish in this process; run_batch overlaps the same stages across stories
+    item = dict(new_story(title, story, scary, poster, sid, gender, save_folder),
+                title_audio_path=title_audio_path, story_audio_path=fulls_audio_path)
+    for stage in (narrate_story, transcribe_story, render_story, upload_story):
+        item = stage(item)
+    return item
+
+def resumable_stories(state=None):
+    # stories handed to the job queue are the render workers' from then on
+    state = state or get_story_state()
+    stories = unfinished(save_folder, "upload")
+    return [s for s in stories
+            if not s.get("queued") and (not s["sid"] or state.stage(s["sid"]) != "uploaded")]
+
+def batch_items(count, resume=True):
+    # unfinished stories count towards the batch and go first
+    items = resumable_stories()[:count] if resume else []
+    return items + list(range(len(items), count))
+
+def run_batch(count, resume=True):
+    # network stages run in threads, Whisper and rendering in their own process pools, and
+    # each stage only works queue_size stories ahead of the next one
+    stages = [
+        Stage("fetch", fetch_story, stage_workers["fetch"]),
+        Stage("narrate", Checkpointed("narrate", narrate_story), stage_workers["narrate"]),
+        Stage("transcribe", Checkpointed("transcribe", transcribe_story), stage_workers["transcribe"], kind="process"),
+        Stage("render", Checkpointed("render", render_story), stage_workers["render"], kind="process"),
+        Stage("upload", Checkpointed("upload", upload_story), stage_workers["upload"]),
+    ]
+    start = time.time()
+    done = run_pipeline(batch_items(count, resume), stages, queue_size=batch_queue_size)
+    hours = (time.time() - start) / 3600
+    print(f"🏁 {len(done)}/{count} stories uploaded in {hours * 60:.1f} min ({len(done) / hours:.1f} videos/hour)")
+    emit_run_summary(stories=count, uploaded=len(done), wall_s=round(hours * 3600, 3),
+                     videos_per_hour=round(len(done) / hours, 2), stage_workers=stage_workers)
+    return done
+
+@measured("enqueue")
+def enqueue_story(story):
+    # the narration goes into the job queue; the story dict carries everything else
+    job_id = get_job_queue().put("render", story, [story["title_audio_path"], story["story_audio_path"]])
+    print(f"📤 {os.path.basename(story['work_dir'])} queued as render job {job_id}")
+    return dict(story, queued=True)
+
+def job_story(queue, job):
+    # the job's story with its files copied into this machine's work dir and its paths pointing there
+    story = job["story"]
+    work_dir = os.path.join(save_folder, story["sid"] or f"job{job['id']}")
+    queue.fetch(job, work_dir)
+
+    def moved(path):
+        # files the job didn't bring along (the narration, for an upload) are None unless they're here already
+        local = path and os.path.join(work_dir, os.path.basename(path))
+        return local if local and os.path.exists(local) else None
+
+    story = dict(story, work_dir=work_dir, title_audio_path=moved(story["title_audio_path"]),
+                 story_audio_path=moved(story["story_audio_path"]))
+    if "videos" in story:
+        story["videos"] = [(moved(path), title) for path, title in story["videos"]]
+        story["thumbnail_path"] = moved(story["thumbnail_path"])
+    return story
+
+def render_job(queue, job):
+    story = job_story(queue, job)
+    for stage, fn in (("transcribe", transcribe_story), ("render", render_story)):
+        story = Checkpointed(stage, fn)(story)
+    paths = [path for path, _ in story["videos"]] + [p for p in [story["thumbnail_path"]] if p]
+    queue.done(job, "upload", story, paths)
+
+def upload_job(queue, job):
+    story = job_story(queue, job)
+    if story["sid"]:
+        get_story_state().advance(story["sid"], "rendered")
+    Checkpointed("upload", upload_story)(story)
+    queue.done(job)
+
+def work_queue(kind, handle, once=False, poll=10):
+    # claims jobs of one kind and runs them one at a time; start more workers for more at once
+    queue = get_job_queue()
+    finished = 0
+    while True:
+        job = queue.claim(kind)
+        if job is None:
+            if once:
+                break
+            time.sleep(poll)
+            continue
+        print(f"📥 {kind} job {job['id']} (attempt {job['attempt']})")
+        try:
+            with queue.holding(job):
+                handle(queue, job)
+            finished += 1
+        except Exception as e:
+            print(f"❌ {kind} job {job['id']} failed: {e}")
+            queue.fail(job, e)
+    print(f"🏁 {finished} {kind} jobs done")
+    return finished
 
-def transform_story(original_text):
+@measured("openai_transform_story")
+def transform_story(original_text, sid=None):
     prompt = (
         "Here's a Reddit story:\n\n"
         f"{original_text}\n\n"
@@ -563,36 +985,29 @@ def transform_story(original_text):
         "The goal is to make this safe to narrate and copyright-free and post it directly to youtube."
     )
 
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": "You are a Reddit user who is sharing a personal experience online."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.9
-    )
-
-    return response.choices[0].message.content
+    messages = [
+        {"role": "system", "content": "You are a Reddit user who is sharing a personal experience online."},
+        {"role": "user", "content": prompt}
+    ]
+    return complete(get_client(), "gpt-4o", messages, 0.9, sid, llm_cache_folder, llm_retries)
 
-def improve_title(text):
+@measured("openai_improve_title")
+def improve_title(text, sid=None):
     prompt = (
         f"Here's a Reddit story:\n\n '{text}'\n\n"
         "Create a reddit-style short single question prompt that may have resulted in the creation of this story."
         "Return only the question prompt. Please do not add any quotation marks or comments. Just return the reddit title as text"
     )
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": "You are a seasoned Redditor who specializes in crafting captivating, emotionally resonant question-style prompts that invite thoughtful responses from the community."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.8
-    )
+    messages = [
+        {"role": "system", "content": "You are a seasoned Redditor who specializes in crafting captivating, emotionally resonant question-style prompts that invite thoughtful responses from the community."},
+        {"role": "user", "content": prompt}
+    ]
+    content = complete(get_client(), "gpt-4o-mini", messages, 0.8, sid, llm_cache_folder, llm_retries)
 
-    return response.choices[0].message.content.strip()
+    return content.strip()
 
-def improve_title1(text):
+def improve_title1(text, sid=None):
     prompt = (
         f"Here's a Reddit story:\n\n '{text}'\n\n"
         "Create a simple title for this story. If its a scary story create an eriee title that you would see on r/nosleep."
@@ -600,18 +1015,16 @@ def improve_title1(text):
         "Return only the title in plain text. Absolutely do not add quotation marks or comments."
     )
 
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": "You are a seasoned Redditor who specializes in crafting captivating, emotionally resonant question-style prompts that invite thoughtful responses from the community."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.8
-    )
+    messages = [
+        {"role": "system", "content": "You are a seasoned Redditor who specializes in crafting captivating, emotionally resonant question-style prompts that invite thoughtful responses from the community."},
+        {"role": "user", "content": prompt}
+    ]
+    content = complete(get_client(), "gpt-4o", messages, 0.8, sid, llm_cache_folder, llm_retries)
 
-    return response.choices[0].message.content.strip()
+    return content.strip()
 
-def guess_story_gender(story_text):
+@measured("openai_guess_gender")
+def guess_story_gender(story_text, sid=None):
     prompt = (
         "Based on the tone, language, and details in the following story, "
         "guess the gender of the person who wrote it. Only respond with one of the following: "
@@ -619,41 +1032,167 @@ def guess_story_gender(story_text):
         f"{story_text}"
     )
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": "You are using logic to determine whether the speaker of a story is Male or Female"},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.2
-    )
+    messages = [
+        {"role": "system", "content": "You are using logic to determine whether the speaker of a story is Male or Female"},
+        {"role": "user", "content": prompt}
+    ]
+    content = complete(get_client(), "gpt-4o-mini", messages, 0.2, sid, llm_cache_folder, llm_retries)
 
-    gender_guess = response.choices[0].message.content.strip()
+    gender_guess = content.strip()
     return gender_guess
 
 def clean(text, bad):
-    text = censor(text, bad)
-    text = censor_sensitive(text)
-    text = clean_text(text)
-    return text
-
-stitle = None
-used_ids_path = "used_ids.txt"
-attempts = 0
-while not stitle and attempts < 5:
-    stitle, sstory, sid, scary, gender = get_random_story(used_ids_path)
-    attempts += 1
-
-stitle = clean(stitle, bad_words)
-sstory = clean(sstory, bad_words)
-
-title_audio_path = os.path.join(save_folder, "title_audio.wav")
-story_audio_path = os.path.join(save_folder, "story_audio.wav")
-
-finalize(stitle, sstory, title_audio_path, story_audio_path, save_folder, scary, gender)
-
-if sid:
-    with open(used_ids_path, "a") as f:
-        f.write(sid + "\n")
+    # same output as censor -> censor_sensitive -> clean_text, compiled once per word list
+    key = tuple(bad)
+    if key not in censor_engines:
+        censor_engines[key] = CensorEngine(bad)
+    return censor_engines[key].clean(text)
+
+def censor_command(args):
+    if args.file:
+        with open(args.file, "r", encoding="utf-8") as f:
+            text = f.read()
+    else:
+        text = sys.stdin.read()
+    print(clean(text, bad_words))
 
-#print("-------------------------\n" + stitle + "\n\n" + sstory + gender)
\ No newline at end of file
+def plan_command(args):
+    if args.input.endswith(".json"):
+        with open(args.input, "r", encoding="utf-8") as f:
+            words = json.load(f)
+    else:
+        # plain text: assume an even narration pace
+        with open(args.input, "r", encoding="utf-8") as f:
+            text = f.read().split()
+        words = [{"text": w, "start": i / args.wps, "end": (i + 0.8) / args.wps} for i, w in enumerate(text)]
+    if not words:
+        sys.exit("No words to plan")
+    for label, parts in (("long_vids", long_vids(words, args.title_seconds)),
+                         ("segment_by_rules", segment_by_rules(words, args.title_seconds))):
+        print(f"\n{label}:")
+        for i, part in enumerate(parts):
+            if part:
+                print(f"  part {i + 1}: {len(part):5d} words  {part[0]['start']:7.2f}s - {part[-1]['end']:7.2f}s"
+                      f"  ({args.title_seconds + part[-1]['end'] - part[0]['start']:.1f}s with title)")
+
+def dry_run_command(args):
+    print(f"render backend: {render_backend}, short mode: {short_mode}, render workers: {render_workers}")
+    print(f"stage workers: {stage_workers}, queue size: {batch_queue_size}")
+    pool = StoryPool(None, story_pool_path)
+    # look, don't touch: no state file yet reads as an empty one instead of creating it
+    if os.path.exists(story_state_path):
+        state = StoryState(story_state_path, read_only=True)
+    else:
+        state = StoryState(":memory:")
+    eligible = pool.eligible(state)
+    by_sub = {}
+    for entry in eligible:
+        by_sub[entry["subreddit"]] = by_sub.get(entry["subreddit"], 0) + 1
+    print(f"story pool: {len(eligible)} eligible {by_sub}")
+    resumable = resumable_stories(state)
+    print(f"unfinished stories: {len(resumable)}")
+    for story in resumable[:args.batch]:
+        print(f"  would resume {story['work_dir']}: {story['title']!r}")
+    if len(resumable) < args.batch:
+        print(f"  would fetch {args.batch - len(resumable)} new stories")
+    index = load_index(media_index_path)
+    durations = [e["duration"] for e in index.values() if e.get("duration")]
+    print(f"gameplay index: {len(durations)} clips, {sum(durations) / 60:.0f} min")
+    if os.path.exists(os.path.join(job_queue_folder, "queue.db")):
+        print(f"job queue: {get_job_queue().counts()}")
+
+def coordinate_command(args):
+    # the fetch and narrate half of run_batch; render workers pick up from the queue
+    os.makedirs(save_folder, exist_ok=True)
+    get_story_pool().start_background_refresh()
+    get_story_state().import_used_ids("used_ids.txt")
+    stages = [
+        Stage("fetch", fetch_story, stage_workers["fetch"]),
+        Stage("narrate", Checkpointed("narrate", narrate_story), stage_workers["narrate"]),
+        Stage("enqueue", Checkpointed("enqueue", enqueue_story)),
+    ]
+    queued = run_pipeline(batch_items(args.batch, not args.no_resume), stages, queue_size=batch_queue_size)
+    print(f"🏁 {len(queued)}/{args.batch} stories queued, {get_job_queue().counts()}")
+
+def render_worker_command(args):
+    # several workers on one node may share a working directory: every job renders inside its
+    # own work dir, MoviePy's temp audio included (build_video puts it next to the output).
+    # Without that, workers sharing a CWD would mux each other's narration, so older builds
+    # need a CWD per worker
+    os.makedirs(save_folder, exist_ok=True)
+    work_queue("render", render_job, args.once, args.poll)
+
+def upload_worker_command(args):
+    work_queue("upload", upload_job, args.once, args.poll)
+
+def preview_command(args):
+    use_preview(args.scale, args.fps)
+    os.makedirs(save_folder, exist_ok=True)
+    if args.work_dir:
+        story = completed(args.work_dir, "fetch")
+        if story is None:
+            sys.exit(f"{args.work_dir} has no fetched story")
+    else:
+        story = fetch_story(0)
+        if story is None:
+            sys.exit("No story found")
+    # narration and timings are checkpointed as usual, so a later run renders this same story
+    for stage, fn in (("narrate", narrate_story), ("transcribe", transcribe_story)):
+        story = Checkpointed(stage, fn)(story)
+    start = time.time()
+    story = preview_story(story)
+    for path, title in story["videos"]:
+        print(f"👀 {title}: {path}")
+    print(f"Preview rendered in {time.time() - start:.1f}s, timings in {story['timing_path']}")
+
+def run_command(args):
+    os.makedirs(save_folder, exist_ok=True)
+    get_story_pool().start_background_refresh()
+    get_story_state().import_used_ids("used_ids.txt")
+    run_batch(args.batch, resume=not args.no_resume)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Turn Reddit stories into narrated videos and upload them.")
+    parser.add_argument("--batch", type=int, default=1, help="number of stories to produce in this run")
+    parser.add_argument("--no-resume", action="store_true", help="don't pick up unfinished stories from earlier runs")
+    parser.set_defaults(func=run_command)
+    commands = parser.add_subparsers(title="commands")
+    censor_parser = commands.add_parser("censor", help="print text the way it would be narrated")
+    censor_parser.add_argument("file", nargs="?", help="text file, default stdin")
+    censor_parser.set_defaults(func=censor_command)
+    plan_parser = commands.add_parser("plan", help="show how a narration would be split into videos")
+    plan_parser.add_argument("input", help="word timings as JSON (transcribe_audio output) or a plain text file")
+    plan_parser.add_argument("--title-seconds", type=float, default=5.0)
+    plan_parser.add_argument("--wps", type=float, default=3.0, help="words per second for plain text")
+    plan_parser.set_defaults(func=plan_command)
+    dry_parser = commands.add_parser("dry-run", help="show what a run would do without calling any service")
+    dry_parser.set_defaults(func=dry_run_command)
+    preview_parser = commands.add_parser("preview", help="render a small, fast preview of a story without uploading it")
+    preview_parser.add_argument("work_dir", nargs="?", help="story folder from an earlier run, default a new story")
+    preview_parser.add_argument("--scale", type=float, default=preview_scale, help="fraction of the full size")
+    preview_parser.add_argument("--fps", type=int, default=preview_fps)
+    preview_parser.set_defaults(func=preview_command)
+    coordinate_parser = commands.add_parser("coordinate", help="fetch and narrate stories into the job queue")
+    coordinate_parser.add_argument("--batch", type=int, default=1, help="number of stories to queue")
+    coordinate_parser.add_argument("--no-resume", action="store_true")
+    coordinate_parser.set_defaults(func=coordinate_command)
+    for name, func, what in (("render-worker", render_worker_command, "transcribe and render queued stories"),
+                             ("upload-worker", upload_worker_command, "upload rendered stories")):
+        worker_parser = commands.add_parser(name, help=what)
+        worker_parser.add_argument("--once", action="store_true", help="exit when the queue has no job left")
+        worker_parser.add_argument("--poll", type=float, default=10, help="seconds between looks at an empty queue")
+        worker_parser.set_defaults(func=func)
+    args = parser.parse_args(argv)
+    try:
+        args.func(args)
+    finally:
+        # run_batch writes its own summary, throughput included; the coordinator, previews and
+        # the workers still report the API calls they made. The offline commands write nothing
+        if args.func not in (run_command, censor_command, plan_command, dry_run_command):
+            emit_run_summary(command=args.func.__name__.replace("_command", "").replace("_", "-"))
+
+# worker processes re-import this module, so the pipeline only runs when executed directly
+if __name__ == "__main__":
+    main()
+
+#print("-------------------------\n" + stitle + "\n\n" + sstory + gender)
@@ -0,0 +1,87 @@
+import fnmatch
+import glob
+import hashlib
+import json
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+from fileio import write_json
+
+def probe(path):
+    from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+    try:
+        infos = ffmpeg_parse_infos(path)
+    except Exception as e:
+        print(f"⚠️  Could not probe {path}: {e}")
+        return {"duration": None, "width": None, "height": None, "fps": None, "codec": None}
+    width, height = infos.get("video_size") or (None, None)
+    return {
+        "duration": infos.get("duration"),
+        "width": width,
+        "height": height,
+        "fps": infos.get("video_fps"),
+        "codec": infos.get("video_codec_name"),
+    }
+
+def fingerprint(path, sample=4 << 20):
+    # size plus the head and tail of the file; cheap enough for thousands of clips
+    # and stable across renames and copies to other machines
+    h = hashlib.sha256()
+    size = os.path.getsize(path)
+    h.update(str(size).encode())
+    with open(path, "rb") as f:
+        h.update(f.read(sample))
+        if size > sample:
+            f.seek(max(size - sample, sample))
+            h.update(f.read(sample))
+    return h.hexdigest()
+
+def probe_and_hash(path):
+    return dict(probe(path), hash=fingerprint(path))
+
+def load_index(index_path):
+    if not os.path.exists(index_path):
+        return {}
+    with open(index_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_index(index, index_path):
+    write_json(index_path, index, indent=1)
+
+def refresh_index(index_path, folder, pattern="*.mp4", workers=8):
+    # only files that are new or whose mtime/size changed get probed again
+    index = load_index(index_path)
+    files = [os.path.abspath(f) for f in glob.glob(os.path.join(folder, pattern))]
+    present = set(files)
+    folder = os.path.abspath(folder)
+    stale = [p for p in index if os.path.dirname(p) == folder and p not in present and fnmatch.fnmatch(p, pattern)]
+    for p in stale:
+        del index[p]
+
+    todo = []
+    for f in files:
+        st = os.stat(f)
+        entry = index.get(f)
+        if not entry or entry["mtime"] != st.st_mtime or entry["size"] != st.st_size or "hash" not in entry:
+            todo.append((f, st))
+    if todo:
+        print(f"🔎 Probing {len(todo)} new or changed media files...")
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for (f, st), info in zip(todo, pool.map(probe_and_hash, [f for f, _ in todo])):
+                index[f] = dict(info, path=f, mtime=st.st_mtime, size=st.st_size)
+    if todo or stale:
+        save_index(index, index_path)
+    return [index[f] for f in files if index[f]["duration"]]
+
+def plan_clips(entries, length):
+    entries = list(entries)
+    random.shuffle(entries)
+    plan = []
+    total = 0
+    for entry in entries:
+        plan.append(entry)
+        total += entry["duration"]
+        if total >= length:
+            break
+    return plan
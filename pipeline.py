@@ -0,0 +1,76 @@
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+STOP = object()
+
+class Stage:
+    # One step of the pipeline. "thread" stages run fn directly in `workers` threads (network
+    # calls); "process" stages hand each item to a pool of `workers` processes (CPU work).
+    # fn takes an item and returns the item for the next stage, or None to drop it.
+    def __init__(self, name, fn, workers=1, kind="thread"):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown stage kind {kind!r}")
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.kind = kind
+
+def run_pipeline(items, stages, queue_size=2, on_error=None):
+    # stages are connected by bounded queues, so a fast stage can only run queue_size items
+    # ahead of the one after it; returns whatever comes out of the last stage
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages] + [queue.Queue()]
+    # spawned, not forked: the other stages' threads are running by then, and a forked child
+    # would inherit their SQLite connections and whatever locks they happened to hold
+    pools = {s.name: ProcessPoolExecutor(max_workers=s.workers, mp_context=get_context("spawn"))
+             for s in stages if s.kind == "process"}
+    remaining = {s.name: s.workers for s in stages}
+    lock = threading.Lock()
+
+    def worker(k, stage):
+        inbox, outbox = queues[k], queues[k + 1]
+        while True:
+            item = inbox.get()
+            if item is STOP:
+                inbox.put(STOP)  # let this stage's other workers see it too
+                with lock:
+                    remaining[stage.name] -= 1
+                    last = remaining[stage.name] == 0
+                if last:
+                    outbox.put(STOP)
+                return
+            start = time.time()
+            try:
+                if stage.kind == "process":
+                    result = pools[stage.name].submit(stage.fn, item).result()
+                else:
+                    result = stage.fn(item)
+            except Exception as e:
+                print(f"❌ {stage.name} failed: {e}")
+                if on_error:
+                    on_error(stage.name, item, e)
+                continue
+            print(f"⏱️  {stage.name} took {time.time() - start:.1f}s")
+            if result is not None:
+                outbox.put(result)
+
+    threads = [threading.Thread(target=worker, args=(k, stage), name=f"{stage.name}-{n}", daemon=True)
+               for k, stage in enumerate(stages) for n in range(stage.workers)]
+    for thread in threads:
+        thread.start()
+    try:
+        for item in items:
+            queues[0].put(item)
+        queues[0].put(STOP)
+        results = []
+        while True:
+            item = queues[-1].get()
+            if item is STOP:
+                break
+            results.append(item)
+    finally:
+        for pool in pools.values():
+            pool.shutdown()
+    return results
@@ -0,0 +1,55 @@
+import argparse
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from ffmpeg_render import ffmpeg_binary
+from fileio import temp_path
+from media_index import refresh_index
+
+def parse_size(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+def proxy_path(cache_dir, entry, size, fps):
+    return os.path.join(cache_dir, f"{entry['hash'][:32]}_{size[0]}x{size[1]}_{fps}.mp4")
+
+def transcode_proxy(src, dst, size, fps):
+    width, height = size
+    tmp_path = temp_path(dst, ".mp4")
+    cmd = [
+        ffmpeg_binary(), "-y", "-hide_banner", "-loglevel", "error", "-i", src, "-an",
+        "-vf", f"scale={width}:{height}:force_original_aspect_ratio=increase,crop={width}:{height},fps={fps},setsar=1",
+        # short GOPs and fastdecode keep seeking and decoding cheap at render time
+        "-c:v", "libx264", "-preset", "veryfast", "-crf", "18", "-g", str(fps), "-tune", "fastdecode",
+        "-pix_fmt", "yuv420p", "-movflags", "+faststart", tmp_path,
+    ]
+    subprocess.run(cmd, check=True)
+    os.replace(tmp_path, dst)
+    return dst
+
+def ensure_proxies(entries, cache_dir, size, fps, workers=2):
+    os.makedirs(cache_dir, exist_ok=True)
+    missing = [e for e in entries if not os.path.exists(proxy_path(cache_dir, e, size, fps))]
+    if missing:
+        print(f"🎞️  Transcoding {len(missing)} background clips to {size[0]}x{size[1]}@{fps} proxies...")
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(lambda e: transcode_proxy(e["path"], proxy_path(cache_dir, e, size, fps), size, fps), missing))
+    return [
+        dict(e, path=proxy_path(cache_dir, e, size, fps), source=e["path"],
+             width=size[0], height=size[1], fps=fps, codec="h264")
+        for e in entries
+    ]
+
+if __name__ == "__main__":
+    # warm the whole cache ahead of time: python proxies.py <folder> <cache_dir>
+    parser = argparse.ArgumentParser(description="Pre-transcode background clips into render proxies")
+    parser.add_argument("folder")
+    parser.add_argument("cache_dir")
+    parser.add_argument("--index", default="media_index.json")
+    parser.add_argument("--size", default="1080x1920")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+    entries = refresh_index(args.index, args.folder, "*.mp4")
+    ensure_proxies(entries, args.cache_dir, parse_size(args.size), args.fps, args.workers)
@@ -0,0 +1,119 @@
+import json
+import os
+import random
+import threading
+import time
+
+from fileio import write_atomic
+
+SUBREDDITS = ['nosleep', 'scarystories', 'tifu', 'AITAH', 'stories']
+SCARY_SUBREDDITS = ['nosleep', 'scarystories']
+COMMENT_SUBREDDITS = ['AskReddit', 'AskMen', 'AskWomen']
+
+class StoryPool:
+    # Eligible top posts for every configured subreddit, kept on disk so picking a story
+    # is a local lookup. Listings are only re-fetched once they are older than
+    # refresh_interval, and posts drop out after ttl unless a refresh sees them again.
+    def __init__(self, reddit, path, subreddits=SUBREDDITS, ttl=24 * 3600, refresh_interval=3600,
+                 limit=20, time_filter="week"):
+        self.reddit = reddit
+        self.path = path
+        self.subreddits = list(subreddits)
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self.limit = limit
+        self.time_filter = time_filter
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+        self.entries = {}
+        self.fetched = {}
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.entries = data.get("entries", {})
+        self.fetched = data.get("fetched", {})
+
+    def save(self):
+        with self.lock:
+            data = json.dumps({"entries": self.entries, "fetched": self.fetched})
+        write_atomic(self.path, data.encode("utf-8"))
+
+    def fetch_subreddit(self, name):
+        entries = []
+        for submission in self.reddit.subreddit(name).top(limit=self.limit, time_filter=self.time_filter):
+            # the checks that don't depend on used ids are applied once, at fetch time
+            if len(submission.selftext) > 3500 or submission.stickied or submission.over_18:
+                continue
+            sub_name = submission.subreddit.display_name
+            comments = sub_name in COMMENT_SUBREDDITS
+            if not comments and len(submission.selftext) < 600:
+                continue
+            entries.append({
+                "id": submission.id,
+                "subreddit": name,
+                "title": submission.title,
+                "selftext": submission.selftext,
+                "author": submission.author.name if submission.author else "[deleted]",
+                "comments": comments,
+            })
+        return entries
+
+    def refresh(self, force=False):
+        with self.refresh_lock:
+            now = time.time()
+            stale = [s for s in self.subreddits if force or now - self.fetched.get(s, 0) > self.refresh_interval]
+            if not stale:
+                return
+            print(f"📥 Refreshing story pool: {', '.join(stale)}")
+            for name in stale:
+                try:
+                    fetched = self.fetch_subreddit(name)
+                except Exception as e:
+                    print(f"⚠️  Could not fetch r/{name}: {e}")
+                    continue
+                with self.lock:
+                    for entry in fetched:
+                        self.entries[entry["id"]] = dict(entry, fetched_at=now)
+                    self.fetched[name] = now
+            with self.lock:
+                self.entries = {k: e for k, e in self.entries.items() if now - e["fetched_at"] <= self.ttl}
+            self.save()
+
+    def eligible(self, used_ids):
+        now = time.time()
+        with self.lock:
+            return [e for e in self.entries.values()
+                    if e["id"] not in used_ids and now - e["fetched_at"] <= self.ttl]
+
+    def pick(self, used_ids):
+        candidates = self.eligible(used_ids)
+        if not candidates:
+            self.refresh()
+            candidates = self.eligible(used_ids)
+        if not candidates:
+            return None
+        # subreddit first, then post, so a busy subreddit doesn't crowd out the others
+        by_sub = {}
+        for entry in candidates:
+            by_sub.setdefault(entry["subreddit"], []).append(entry)
+        entry = random.choice(by_sub[random.choice(sorted(by_sub))])
+        with self.lock:
+            self.entries.pop(entry["id"], None)
+        self.save()
+        return entry
+
+    def start_background_refresh(self):
+        def loop():
+            while True:
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"⚠️  Story pool refresh failed: {e}")
+                time.sleep(max(60, self.refresh_interval / 4))
+        thread = threading.Thread(target=loop, name="story-pool-refresh", daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,119 @@
+import os
+import pathlib
+import socket
+import sqlite3
+import threading
+import time
+
+STAGES = ("claimed", "rewritten", "narrated", "rendered", "uploaded")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    id TEXT PRIMARY KEY,
+    stage TEXT NOT NULL,
+    worker TEXT,
+    claimed_at REAL,
+    rewritten_at REAL,
+    narrated_at REAL,
+    rendered_at REAL,
+    uploaded_at REAL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS submissions_stage ON submissions (stage);
+"""
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+class StoryState:
+    # Lifecycle of every submission we've touched. A row is created by claim(), so two
+    # workers can never both own a story; claims that never reach "uploaded" expire after
+    # lease seconds so a crashed run doesn't bury its story forever.
+    # read_only=True opens an existing file without creating or changing anything.
+    def __init__(self, path, lease=6 * 3600, read_only=False):
+        self.path = path
+        self.lease = lease
+        self.lock = threading.Lock()
+        if read_only:
+            self.db = sqlite3.connect(f"{pathlib.Path(path).resolve().as_uri()}?mode=ro", uri=True, timeout=30,
+                                      isolation_level=None, check_same_thread=False)
+            return
+        self.db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+
+    def __contains__(self, submission_id):
+        # primary-key lookup, so this stays O(1)-ish however long the history gets
+        with self.lock:
+            row = self.db.execute("SELECT stage, claimed_at FROM submissions WHERE id = ?", (submission_id,)).fetchone()
+        if row is None:
+            return False
+        stage, claimed_at = row
+        return stage == "uploaded" or (claimed_at or 0) > time.time() - self.lease
+
+    def claim(self, submission_id, worker=None):
+        now = time.time()
+        worker = worker or worker_name()
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                inserted = self.db.execute(
+                    "INSERT OR IGNORE INTO submissions (id, stage, worker, claimed_at, updated_at) "
+                    "VALUES (?, 'claimed', ?, ?, ?)",
+                    (submission_id, worker, now, now)).rowcount
+                if not inserted:
+                    # take over a claim whose owner never finished within the lease
+                    inserted = self.db.execute(
+                        "UPDATE submissions SET stage = 'claimed', worker = ?, claimed_at = ?, updated_at = ?, "
+                        "rewritten_at = NULL, narrated_at = NULL, rendered_at = NULL "
+                        "WHERE id = ? AND stage != 'uploaded' AND claimed_at < ?",
+                        (worker, now, now, submission_id, now - self.lease)).rowcount
+                self.db.execute("COMMIT")
+            except Exception:
+                self.db.execute("ROLLBACK")
+                raise
+        return inserted == 1
+
+    def advance(self, submission_id, stage):
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage {stage!r}")
+        now = time.time()
+        with self.lock:
+            self.db.execute(
+                f"UPDATE submissions SET stage = ?, {stage}_at = ?, updated_at = ? WHERE id = ?",
+                (stage, now, now, submission_id))
+
+    def renew(self, submission_id, worker=None):
+        # restart the lease of a story that's being picked up again, keeping its progress
+        now = time.time()
+        with self.lock:
+            self.db.execute(
+                "UPDATE submissions SET worker = ?, claimed_at = ?, updated_at = ? WHERE id = ? AND stage != 'uploaded'",
+                (worker or worker_name(), now, now, submission_id))
+
+    def release(self, submission_id):
+        # give a claimed story back, e.g. when it turned out unusable
+        with self.lock:
+            self.db.execute("DELETE FROM submissions WHERE id = ? AND stage != 'uploaded'", (submission_id,))
+
+    def stage(self, submission_id):
+        with self.lock:
+            row = self.db.execute("SELECT stage FROM submissions WHERE id = ?", (submission_id,)).fetchone()
+        return row[0] if row else None
+
+    def import_used_ids(self, used_ids_path):
+        # one-time migration from the old append-only used_ids.txt
+        if not os.path.exists(used_ids_path):
+            return 0
+        with open(used_ids_path, "r") as f:
+            ids = [line.strip() for line in f if line.strip()]
+        now = time.time()
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            self.db.executemany(
+                "INSERT OR IGNORE INTO submissions (id, stage, uploaded_at, updated_at) VALUES (?, 'uploaded', ?, ?)",
+                [(sid, now, now) for sid in ids])
+            self.db.execute("COMMIT")
+        os.replace(used_ids_path, used_ids_path + ".imported")
+        print(f"📦 Imported {len(ids)} used ids from {used_ids_path}")
+        return len(ids)
@@ -0,0 +1,124 @@
+import bisect
+import heapq
+from functools import lru_cache
+
+import numpy as np
+from moviepy import TextClip, VideoClip
+from PIL import ImageColor, ImageFont
+
+SUBTITLE_STYLE = {
+    "font_size": 100,
+    "color": "white",
+    "stroke_color": "black",
+    "stroke_width": 10,
+}
+
+def subtitle_style(scale=1.0):
+    # previews keep the text and its placement but shrink it, with a hairline outline
+    # instead of the thick stroke
+    if scale == 1:
+        return SUBTITLE_STYLE
+    return dict(SUBTITLE_STYLE, font_size=max(8, round(SUBTITLE_STYLE["font_size"] * scale)), stroke_width=1)
+
+BLANK_FRAME = (np.zeros((1, 1, 3), dtype="uint8"), np.zeros((1, 1), dtype="uint8"))
+
+def phrase_cues(groups, offset=0):
+    # one cue per word, showing the group's text up to and including that word
+    cues = []
+    for group in groups:
+        i = 0
+        for word in group["words"]:
+            text = " ".join([w["text"] for w in group["words"][:i+1]])
+            cues.append((word["start"] + offset, word["end"] + offset, text))
+            i += 1
+    return cues
+
+@lru_cache(maxsize=1024)
+def rasterize_phrase(text, font_path, font_size, color, stroke_color, stroke_width):
+    clip = TextClip(font=font_path,
+                    text=text,
+                    font_size=font_size,
+                    color=color,
+                    stroke_color=stroke_color,
+                    stroke_width=stroke_width,
+                    method='label')
+    rgb = clip.get_frame(0).astype("uint8")
+    alpha = np.round(clip.mask.get_frame(0) * 255).astype("uint8")
+    clip.close()
+    return rgb, alpha
+
+def build_timeline(cues):
+    # flatten possibly overlapping cues into back-to-back slots; where cues overlap the
+    # later one wins, same as it did when every cue was its own layer on the composite
+    times = sorted({t for start, end, _ in cues for t in (start, end)})
+    order = sorted(range(len(cues)), key=lambda k: cues[k][0])
+    texts = []
+    active = []
+    j = 0
+    for t in times:
+        while j < len(order) and cues[order[j]][0] <= t:
+            heapq.heappush(active, -order[j])
+            j += 1
+        while active and cues[-active[0]][1] <= t:
+            heapq.heappop(active)
+        texts.append(cues[-active[0]][2] if active else None)
+    return times, texts
+
+def make_subtitle_layer(cues, font_path, style=SUBTITLE_STYLE):
+    times, texts = build_timeline(cues)
+    duration = times[-1] if times else 0
+
+    def frame_at(t):
+        k = bisect.bisect_right(times, t) - 1
+        text = texts[k] if k >= 0 else None
+        if text is None:
+            return BLANK_FRAME
+        return rasterize_phrase(text, font_path, **style)
+
+    mask = VideoClip(lambda t: frame_at(t)[1] / 255.0, is_mask=True, duration=duration, has_constant_size=False)
+    layer = VideoClip(lambda t: frame_at(t)[0], duration=duration, has_constant_size=False)
+    return layer.with_mask(mask).with_position('center')
+
+def ass_time(t):
+    cs = int(round(t * 100))
+    h, cs = divmod(cs, 360000)
+    m, cs = divmod(cs, 6000)
+    s, cs = divmod(cs, 100)
+    return f"{h}:{m:02d}:{s:02d}.{cs:02d}"
+
+def ass_colour(name):
+    r, g, b = ImageColor.getrgb(name)[:3]
+    return f"&H00{b:02X}{g:02X}{r:02X}"
+
+def ass_escape(text):
+    return text.replace("\\", "\\\\").replace("{", "\\{").replace("}", "\\}").replace("\n", " ")
+
+def write_ass(cues, output_path, font_path, size, style=SUBTITLE_STYLE):
+    font_name = ImageFont.truetype(font_path, style["font_size"]).getname()[0]
+    times, texts = build_timeline(cues)
+    lines = [
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        f"PlayResX: {size[0]}",
+        f"PlayResY: {size[1]}",
+        "WrapStyle: 2",
+        "ScaledBorderAndShadow: yes",
+        "",
+        "[V4+ Styles]",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+        "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
+        "Alignment, MarginL, MarginR, MarginV, Encoding",
+        f"Style: Default,{font_name},{style['font_size']},{ass_colour(style['color'])},{ass_colour(style['color'])},"
+        f"{ass_colour(style['stroke_color'])},&H00000000,0,0,0,0,100,100,0,0,1,{style['stroke_width']},0,5,0,0,0,1",
+        "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+    ]
+    # the timeline is already flattened, so libass never has to stack overlapping events
+    for k in range(len(texts) - 1):
+        if texts[k] is None:
+            continue
+        lines.append(f"Dialogue: 0,{ass_time(times[k])},{ass_time(times[k+1])},Default,,0,0,0,,{ass_escape(texts[k])}")
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    return output_path
@@ -0,0 +1,64 @@
+import argparse
+import json
+import os
+import sys
+
+from fileio import write_json
+
+REPORT = "timing.json"
+PREVIEW_FOLDER = "preview"
+
+def cue_rows(cues):
+    return [[round(start, 3), round(end, 3), text] for start, end, text in cues]
+
+def write_report(work_dir, report):
+    return write_json(os.path.join(work_dir, REPORT), report, indent=1)
+
+def load_report(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def mismatches(a, b, where="", tolerance=0.0015, skip=("render",)):
+    # one line per difference between two reports; the render section (size, frame rate,
+    # keyframes snapped to the frame grid) is expected to differ between a preview and a render
+    if isinstance(a, dict) and isinstance(b, dict):
+        out = []
+        for key in sorted(set(a) | set(b)):
+            if key in skip:
+                continue
+            at = f"{where}.{key}" if where else key
+            if key not in a or key not in b:
+                out.append(f"{at}: only in the {'first' if key in a else 'second'} report")
+            else:
+                out += mismatches(a[key], b[key], at, tolerance, skip)
+        return out
+    if isinstance(a, list) and isinstance(b, list):
+        out = [] if len(a) == len(b) else [f"{where}: {len(a)} != {len(b)} entries"]
+        for i, (x, y) in enumerate(zip(a, b)):
+            out += mismatches(x, y, f"{where}[{i}]", tolerance, skip)
+        return out
+    numbers = (int, float)
+    if isinstance(a, numbers) and isinstance(b, numbers) and not isinstance(a, bool) and not isinstance(b, bool):
+        return [] if abs(a - b) <= tolerance else [f"{where}: {a} != {b}"]
+    return [] if a == b else [f"{where}: {a!r} != {b!r}"]
+
+def print_mismatches(diffs, first, second, limit=20):
+    if not diffs:
+        print(f"⏱️  {second} matches {first}")
+        return
+    print(f"⚠️  {len(diffs)} timing mismatches between {first} and {second}:")
+    for line in diffs[:limit]:
+        print(f"  {line}")
+    if len(diffs) > limit:
+        print(f"  ... and {len(diffs) - limit} more")
+
+if __name__ == "__main__":
+    # python timing.py <work_dir>/preview/timing.json <work_dir>/timing.json; exits 1 on a mismatch
+    parser = argparse.ArgumentParser(description="Compare the timing reports of two renders")
+    parser.add_argument("first")
+    parser.add_argument("second")
+    parser.add_argument("--tolerance", type=float, default=0.0015, help="seconds two times may differ by")
+    args = parser.parse_args()
+    diffs = mismatches(load_report(args.first), load_report(args.second), tolerance=args.tolerance)
+    print_mismatches(diffs, args.first, args.second)
+    sys.exit(1 if diffs else 0)
@@ -0,0 +1,130 @@
+import functools
+import os
+import textwrap
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+TEMPLATE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+@functools.lru_cache(maxsize=None)
+def templates(folder=TEMPLATE_DIR):
+    # top.png/middle.png/bottom.png are read once per process, not once per card
+    images = []
+    for name in ("top.png", "middle.png", "bottom.png"):
+        with Image.open(os.path.join(folder, name)) as im:
+            images.append(im.convert("RGBA"))
+    return tuple(images)
+
+@functools.lru_cache(maxsize=8)
+def stretched_middle(width, height, folder=TEMPLATE_DIR):
+    return templates(folder)[1].resize((width, height))
+
+@functools.lru_cache(maxsize=8)
+def load_font(path, size):
+    return ImageFont.truetype(path, size)
+
+def wrap_title(title_text, max_chars_per_line=26):
+    return textwrap.wrap(title_text, width=max_chars_per_line, break_long_words=False)
+
+def compose_card(title_text, width=1560, font_path=None, font_size=110, padding=40, max_chars_per_line=26):
+    top, _, bottom = templates()
+    lines = wrap_title(title_text, max_chars_per_line)
+    line_height = font_size + 20
+    middle = stretched_middle(width, line_height * len(lines) + 80)
+
+    canvas = Image.new("RGBA", (width, top.height + middle.height + bottom.height))
+    canvas.paste(top, (0, 0))
+    canvas.paste(middle, (0, top.height))
+    canvas.paste(bottom, (0, top.height + middle.height))
+
+    font = load_font(font_path, font_size)
+    draw = ImageDraw.Draw(canvas)
+    y = top.height + padding
+    for line in lines:
+        draw.text((padding, y), line, font=font, fill="white")
+        y += line_height
+    return canvas
+
+def scale_at(t, duration, start=0.35, growth=0.08):
+    return start + growth * (t / duration)
+
+def card_layout(path, title_text, max_chars_per_line=26):
+    # what a timing report records about a card: its lines and the sizes it grows between,
+    # in PNG pixels whatever size the video is rendered at
+    with Image.open(path) as im:
+        width, height = im.size
+    return {"lines": wrap_title(title_text, max_chars_per_line), "size": [width, height],
+            "grows": [[int(width * s), int(height * s)] for s in (scale_at(0, 1), scale_at(1, 1))]}
+
+def fade_at(t, duration, fade=0.3):
+    # FadeIn/FadeOut from and to black; alpha is left alone, as MoviePy does
+    return min(1.0, t / fade, (duration - t) / fade) if fade else 1.0
+
+class CardAnimation:
+    # The title card's grow-and-fade. Every distinct on-screen size (consecutive frames often
+    # round to the same one) is resampled once and kept, for the image and its mask together,
+    # instead of Resize resampling both on every frame. Only the largest size comes from the
+    # full 1560px card; the rest are taken from that, which is ~5x cheaper and within a level
+    # or two of grey on average. Sizes are filled in as frames are asked for, so a segment
+    # that never shows the title pays for one frame. The fade is applied on lookup. scale < 1
+    # shrinks the whole animation for renders below full size.
+    def __init__(self, card, duration, fps, fade=0.3, scale=1.0):
+        self.card = card
+        self.duration = duration
+        self.fps = fps
+        n = max(1, int(duration * fps + 1e-6))
+        times = [k / fps for k in range(n)]
+        self.sizes = [(int(card.width * scale * scale_at(t, duration)),
+                       int(card.height * scale * scale_at(t, duration))) for t in times]
+        self.fades = [fade_at(t, duration, fade) for t in times]
+        self.largest = None
+        self.frames = {}
+
+    @property
+    def nbytes(self):
+        return sum(rgb.nbytes + alpha.nbytes for rgb, alpha in self.frames.values())
+
+    def resampled(self, size):
+        if size not in self.frames:
+            if self.largest is None:
+                self.largest = self.card.resize(max(self.sizes), Image.Resampling.LANCZOS)
+            frame = self.largest if size == self.largest.size else self.largest.resize(size, Image.Resampling.LANCZOS)
+            frame = np.asarray(frame)
+            self.frames[size] = (np.ascontiguousarray(frame[..., :3]), np.ascontiguousarray(frame[..., 3]))
+        return self.frames[size]
+
+    def prerender(self):
+        for size in self.sizes:
+            self.resampled(size)
+        return self
+
+    def index(self, t):
+        return min(max(int(round(t * self.fps)), 0), len(self.sizes) - 1)
+
+    def frame(self, t):
+        k = self.index(t)
+        rgb = self.resampled(self.sizes[k])[0]
+        return rgb if self.fades[k] >= 1 else rgb * self.fades[k]
+
+    def mask(self, t):
+        # MoviePy turns the mask back into bytes by truncating mask * 255; the half step
+        # makes that land on the stored alpha exactly
+        alpha = self.resampled(self.sizes[self.index(t)])[1]
+        return np.minimum((alpha + 0.5) / 255, 1.0)
+
+    def clip(self):
+        from moviepy import VideoClip
+        mask = VideoClip(self.mask, is_mask=True, duration=self.duration)
+        return VideoClip(self.frame, duration=self.duration).with_mask(mask)
+
+# a story's two cards; each holds up to ~100 MB of frames once fully played
+@functools.lru_cache(maxsize=2)
+def cached_animation(path, mtime, duration, fps, fade, scale):
+    with Image.open(path) as im:
+        card = im.convert("RGBA")
+    return CardAnimation(card, duration, fps, fade, scale)
+
+def animation(path, duration, fps, fade=0.3, scale=1.0):
+    # every clip made from the same card in this process shares the resampled frames
+    return cached_animation(path, os.stat(path).st_mtime_ns, round(duration, 6), fps, fade, scale)
@@ -0,0 +1,96 @@
+import base64
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from fileio import cache_path, write_atomic, write_json
+from instrument import count
+
+def chunk_key(text, voice, model):
+    return hashlib.sha256(json.dumps([text, voice, model]).encode("utf-8")).hexdigest()
+
+TIMESTAMPS_URL = "https://api.elevenlabs.io/v1/text-to-speech/{voice}/with-timestamps"
+
+def timestamped_generator(api_key, output_format="mp3_44100_128", timeout=120):
+    # same call shape as elevenlabs.generate, but the response also says when every character
+    # is spoken, which spares us transcribing our own script afterwards
+    def generate(text, voice, model):
+        import requests
+        response = requests.post(TIMESTAMPS_URL.format(voice=voice), params={"output_format": output_format},
+                                 headers={"xi-api-key": api_key}, json={"text": text, "model_id": model},
+                                 timeout=timeout)
+        response.raise_for_status()
+        body = response.json()
+        return base64.b64decode(body["audio_base64"]), body.get("alignment")
+    return generate
+
+def read_cached(cache_dir, key):
+    # (audio, alignment); alignment is None for chunks synthesized without timestamps
+    if not cache_dir:
+        return None
+    path = cache_path(cache_dir, key, ".mp3")
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        audio = f.read()
+    alignment = None
+    if os.path.exists(cache_path(cache_dir, key, ".json")):
+        with open(cache_path(cache_dir, key, ".json"), "r", encoding="utf-8") as f:
+            alignment = json.load(f)
+    return audio, alignment
+
+def write_cached(cache_dir, key, audio, alignment=None):
+    if not cache_dir:
+        return
+    path = cache_path(cache_dir, key, ".mp3")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # the timings go first: an mp3 without its json just reads as an untimed chunk
+    if alignment is not None:
+        write_json(cache_path(cache_dir, key, ".json"), alignment)
+    write_atomic(path, audio)
+
+def synthesize_chunk(generate_fn, text, voice, model, cache_dir=None, retries=3, backoff=1.0, timestamps=False):
+    # returns (mp3 bytes, alignment or None); generate_fn may hand back bytes, a stream of
+    # bytes, or an (audio, alignment) pair. With timestamps=True a cached chunk that has
+    # no timings is synthesized again rather than served without them.
+    key = chunk_key(text, voice, model)
+    cached = read_cached(cache_dir, key)
+    if cached is not None and (cached[1] is not None or not timestamps):
+        count("elevenlabs", calls=0, cache_hits=1)
+        return cached
+    attempts = max(1, retries)
+    for attempt in range(attempts):
+        try:
+            count("elevenlabs", chars=len(text))
+            audio = generate_fn(text=text, voice=voice, model=model)
+            alignment = None
+            if isinstance(audio, tuple):
+                audio, alignment = audio
+            if not isinstance(audio, bytes):
+                audio = b"".join(audio)
+            break
+        except Exception as e:
+            if attempt == attempts - 1:
+                raise
+            wait = backoff * 2 ** attempt
+            print(f"⚠️  TTS chunk failed ({e}), retrying in {wait:.1f}s...")
+            time.sleep(wait)
+    write_cached(cache_dir, key, audio, alignment)
+    return audio, alignment
+
+def synthesize_chunks(generate_fn, chunks, voice, model, cache_dir=None, workers=4, retries=3, backoff=1.0,
+                      timestamps=False):
+    results = [None] * len(chunks)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(synthesize_chunk, generate_fn, chunk, voice, model, cache_dir, retries, backoff, timestamps): i
+            for i, chunk in enumerate(chunks)
+        }
+        done = 0
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+            done += 1
+            print(f"🧩 Synthesized chunk {done}/{len(chunks)}")
+    return results
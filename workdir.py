@@ -0,0 +1,101 @@
+import glob
+import hashlib
+import json
+import os
+
+from fileio import write_json
+
+MANIFEST = "manifest.json"
+
+def manifest_path(work_dir):
+    return os.path.join(work_dir, MANIFEST)
+
+def load_manifest(work_dir):
+    path = manifest_path(work_dir)
+    if not os.path.exists(path):
+        return {"stages": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_manifest(work_dir, manifest):
+    write_json(manifest_path(work_dir), manifest, indent=1)
+
+def content_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def snapshot(work_dir):
+    files = {}
+    for name in os.listdir(work_dir):
+        path = os.path.join(work_dir, name)
+        if name != MANIFEST and not name.endswith(".tmp") and os.path.isfile(path):
+            st = os.stat(path)
+            files[name] = (st.st_mtime, st.st_size)
+    return files
+
+def completed(work_dir, stage):
+    # the story as the stage left it, if the stage finished and its outputs are still intact
+    entry = load_manifest(work_dir)["stages"].get(stage)
+    if entry is None:
+        return None
+    for name, digest in entry["outputs"].items():
+        path = os.path.join(work_dir, name)
+        if not os.path.exists(path) or content_hash(path) != digest:
+            print(f"⚠️  {name} changed since {stage} finished, redoing it")
+            return None
+    return entry["story"]
+
+def record(work_dir, stage, story, before=None):
+    # whatever the stage created or rewrote in the work dir counts as its output
+    before = before or {}
+    outputs = {name: content_hash(os.path.join(work_dir, name))
+               for name, stat in snapshot(work_dir).items() if before.get(name) != stat}
+    manifest = load_manifest(work_dir)
+    manifest["stages"][stage] = {"outputs": outputs, "story": story}
+    save_manifest(work_dir, manifest)
+
+def forget_from(work_dir, stage):
+    # redoing a stage invalidates it and everything recorded after it
+    manifest = load_manifest(work_dir)
+    names = list(manifest["stages"])
+    if stage in names:
+        for name in names[names.index(stage):]:
+            del manifest["stages"][name]
+        save_manifest(work_dir, manifest)
+
+class Checkpointed:
+    # Wraps a stage function that takes and returns a story dict with a "work_dir". A stage
+    # that already finished with intact outputs is skipped; defined at module level so it
+    # can be handed to process pools.
+    def __init__(self, stage, fn):
+        self.stage = stage
+        self.fn = fn
+
+    def __call__(self, story):
+        work_dir = story["work_dir"]
+        done = completed(work_dir, self.stage)
+        if done is not None:
+            print(f"⏭️  {self.stage} already done for {os.path.basename(work_dir)}")
+            return done
+        forget_from(work_dir, self.stage)
+        before = snapshot(work_dir)
+        story = self.fn(story)
+        if story is not None:
+            record(work_dir, self.stage, story, before)
+        return story
+
+def resumable(work_dir, last_stage):
+    # the story as its last recorded stage left it, if the work dir never got to last_stage
+    stages = load_manifest(work_dir)["stages"]
+    if stages and last_stage not in stages:
+        return list(stages.values())[-1]["story"]
+    return None
+
+def unfinished(root, last_stage):
+    # stories whose work dir has a manifest that never got to last_stage, oldest first
+    paths = sorted(glob.glob(os.path.join(root, "*", MANIFEST)), key=os.path.getmtime)
+    stories = [resumable(os.path.dirname(path), last_stage) for path in paths]
+    return [story for story in stories if story is not None]
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from fileio import write_json
+
+UPLOAD_URL = "https://www.googleapis.com/upload/youtube/v3/videos"
+THUMBNAIL_URL = "https://www.googleapis.com/upload/youtube/v3/thumbnails/set"
+RETRY_STATUS = (500, 502, 503, 504)
+
+class UploadError(Exception):
+    pass
+
+class SessionExpired(Exception):
+    pass
+
+class Uploader:
+    # YouTube's resumable upload protocol over one authorized, requests-style session
+    # (google.auth's AuthorizedSession in production). Files go up in chunk_size pieces;
+    # the session URI of every upload in flight is kept in session_dir, so an upload that
+    # died with the process continues from the last byte the server acknowledged. A finished
+    # upload keeps its file with the API response, so asking again returns that video
+    # instead of posting a second one.
+    def __init__(self, session, session_dir, chunk_size=8 << 20, retries=5, backoff=1.0,
+                 upload_url=UPLOAD_URL, thumbnail_url=THUMBNAIL_URL, timeout=60):
+        if chunk_size % (256 << 10):
+            raise ValueError("chunk_size must be a multiple of 256 KiB")
+        self.session = session
+        self.session_dir = session_dir
+        self.chunk_size = chunk_size
+        self.retries = retries
+        self.backoff = backoff
+        self.upload_url = upload_url
+        self.thumbnail_url = thumbnail_url
+        self.timeout = timeout
+        os.makedirs(session_dir, exist_ok=True)
+
+    def session_file(self, path, body):
+        st = os.stat(path)
+        key = json.dumps([os.path.abspath(path), st.st_size, st.st_mtime, body], sort_keys=True)
+        return os.path.join(self.session_dir, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
+
+    def start(self, path, body):
+        response = self.session.request(
+            "POST", self.upload_url, params={"uploadType": "resumable", "part": "snippet,status"},
+            headers={"Content-Type": "application/json; charset=UTF-8",
+                     "X-Upload-Content-Length": str(os.path.getsize(path)),
+                     "X-Upload-Content-Type": "video/mp4"},
+            data=json.dumps(body), timeout=self.timeout)
+        if response.status_code != 200:
+            raise UploadError(f"Could not start upload ({response.status_code}): {response.text}")
+        return response.headers["Location"]
+
+    def progress(self, uri, total):
+        # ask the server how much it has; returns (next offset, None) or (total, finished response)
+        response = self.session.request("PUT", uri, headers={"Content-Range": f"bytes */{total}"},
+                                        data=b"", timeout=self.timeout)
+        return self.handle(response, total)
+
+    def handle(self, response, total):
+        if response.status_code in (200, 201):
+            return total, response.json()
+        if response.status_code == 308:
+            received = response.headers.get("Range")
+            return (int(received.rsplit("-", 1)[1]) + 1 if received else 0), None
+        if response.status_code in (404, 410):
+            raise SessionExpired()
+        if response.status_code in RETRY_STATUS:
+            raise ConnectionError(f"server returned {response.status_code}")
+        raise UploadError(f"Upload failed ({response.status_code}): {response.text}")
+
+    def upload(self, path, body):
+        total = os.path.getsize(path)
+        state_path = self.session_file(path, body)
+        uri, offset, result = None, 0, None
+        if os.path.exists(state_path):
+            with open(state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("response"):
+                print(f"⏭️  {os.path.basename(path)} was already uploaded")
+                return state["response"]
+            uri = state["uri"]
+            try:
+                offset, result = self.progress(uri, total)
+                print(f"🔁 Resuming {os.path.basename(path)} at {offset / max(total, 1):.0%}")
+            except SessionExpired:
+                uri = None
+        if uri is None:
+            uri = self.start(path, body)
+            write_json(state_path, {"uri": uri, "path": path})
+
+        failures = 0
+        resync = False
+        with open(path, "rb") as f:
+            while result is None:
+                try:
+                    if resync:
+                        # after a failure the server decides where we continue from
+                        offset, result = self.progress(uri, total)
+                        resync = False
+                        continue
+                    f.seek(offset)
+                    chunk = f.read(self.chunk_size)
+                    end = offset + len(chunk) - 1
+                    response = self.session.request(
+                        "PUT", uri, headers={"Content-Range": f"bytes {offset}-{end}/{total}"},
+                        data=chunk, timeout=self.timeout)
+                    offset, result = self.handle(response, total)
+                    failures = 0
+                    print(f"Uploaded {os.path.basename(path)} {offset / max(total, 1):.0%}")
+                except OSError as e:
+                    # requests' ConnectionError and Timeout are OSErrors too
+                    failures += 1
+                    if failures > self.retries:
+                        raise
+                    wait = self.backoff * 2 ** (failures - 1)
+                    print(f"⚠️  Upload chunk failed ({e}), retrying in {wait:.1f}s...")
+                    time.sleep(wait)
+                    resync = True
+        write_json(state_path, {"uri": uri, "path": path, "response": result})
+        return result
+
+    def set_thumbnail(self, video_id, path):
+        with open(path, "rb") as f:
+            response = self.session.request(
+                "POST", self.thumbnail_url, params={"videoId": video_id, "uploadType": "media"},
+                headers={"Content-Type": "image/png"}, data=f.read(), timeout=self.timeout)
+        if response.status_code != 200:
+            raise UploadError(f"Thumbnail upload failed ({response.status_code}): {response.text}")
+
+    def upload_many(self, jobs, workers=3, on_done=None):
+        # jobs are (path, body) pairs; returns the API responses in the same order.
+        # on_done(index, response) runs as each one finishes, so parts that made it are
+        # dealt with even when another part fails; the first failure is raised at the end
+        responses = [None] * len(jobs)
+        error = None
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(self.upload, *job): i for i, job in enumerate(jobs)}
+            for future in as_completed(futures):
+                try:
+                    responses[futures[future]] = future.result()
+                except Exception as e:
+                    error = error or e
+                    continue
+                if on_done:
+                    on_done(futures[future], responses[futures[future]])
+        if error:
+            raise error
+        return responses